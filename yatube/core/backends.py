@@ -0,0 +1,58 @@
+import time
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.backends.django import DjangoTemplates, Template
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .metrics import aggregator, record_cache_lookup, timed_template
+
+_missing = object()
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed_template():
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django с замером времени рендеринга для MetricsMiddleware."""
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return InstrumentedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи cache.get для MetricsMiddleware."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        record_cache_lookup(value is not _missing)
+        return default if value is _missing else value
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedDatabaseCache(InstrumentedCacheMixin, DatabaseCache):
+    pass
+
+
+class InstrumentedThumbnailBackend(ThumbnailBackend):
+    """Миниатюры sorl-thumbnail с замером времени их создания."""
+
+    def _create_thumbnail(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super()._create_thumbnail(*args, **kwargs)
+        finally:
+            aggregator.observe(
+                'thumbnail_seconds', time.perf_counter() - start
+            )
@@ -0,0 +1,118 @@
+import hashlib
+import json
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import AutoField
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite,
+    ключ SQLITE_PRAGMAS в настройках базы дополняет их.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = {
+        **settings.SQLITE_PRAGMAS,
+        **connection.settings_dict.get('SQLITE_PRAGMAS', {}),
+    }
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, pragmas)
+
+
+@contextmanager
+def wrap_all_queries(wrapper):
+    """Подключает execute_wrapper ко всем базам на время блока."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+def batches(items, size=500):
+    """Списки по size элементов items для IN в пределах лимита SQLite."""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def explain_count(queryset):
+    """Оценка числа строк queryset по плану запроса PostgreSQL."""
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def density_count(queryset, sample):
+    """
+    Оценка числа строк таблицы по плотности первичных ключей: sample
+    самых новых строк занимают какой-то отрезок ключей, с той же
+    плотностью заполнен весь отрезок от наименьшего ключа до
+    наибольшего. Читаются sample + 1 ключей и два конца по индексу,
+    полного COUNT нет. None, если строк не больше sample.
+    """
+    pks = queryset.order_by('-pk').values_list('pk', flat=True)
+    edge = pks[sample:sample + 1].first()
+    if edge is None:
+        return None
+    newest = pks.first()
+    oldest = queryset.order_by('pk').values_list('pk', flat=True).first()
+    return 1 + round((newest - oldest) * sample / (newest - edge))
+
+
+def estimate_count(queryset, sample):
+    """
+    Оценка числа строк queryset без полного подсчёта: по плану запроса
+    на PostgreSQL, иначе по плотности целочисленных ключей. Плотность
+    новых строк под фильтром ничего не говорит о старых, поэтому она
+    берётся только для всей таблицы. None, если оценить нельзя.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return explain_count(queryset)
+    if queryset.query.where:
+        return None
+    if isinstance(queryset.model._meta.pk, AutoField):
+        return density_count(queryset, sample)
+    return None
+
+
+def cached_count(queryset, scope=''):
+    """
+    Число строк queryset для пагинации. Хранится в кэше по тексту
+    запроса и scope COUNT_CACHE_TIMEOUT секунд: изменения появляются в
+    счётчике с этой задержкой, последние страницы могут оказаться
+    пустыми. scope различает запросы с одинаковым текстом, но разными
+    данными подзапросов. Точно считается не больше COUNT_EXACT_LIMIT
+    строк, дальше берётся оценка, а без неё COUNT_EXACT_LIMIT + 1:
+    полного COUNT на горячем пути нет.
+    """
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        # Фильтр по пустому списку: запроса нет, строк тоже
+        return 0
+    query = hashlib.md5(sql.encode()).hexdigest()
+    key = f'count:{scope}:{query}'
+    count = cache.get(key)
+    if count is not None:
+        return count
+    limit = settings.COUNT_EXACT_LIMIT
+    count = queryset.order_by()[:limit + 1].count()
+    if count > limit:
+        count = max(estimate_count(queryset, limit) or 0, limit + 1)
+    cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count
@@ -0,0 +1,10 @@
+from django import forms
+
+
+class ProfilerSwitchForm(forms.Form):
+    sample_rate = forms.FloatField(
+        label='Доля профилируемых запросов',
+        min_value=0,
+        max_value=1,
+        help_text='0 — профилирование выключено, 1 — каждый запрос',
+    )
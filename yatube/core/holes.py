@@ -0,0 +1,6 @@
+from .page_holes import register_hole
+
+
+@register_hole('header', 'includes/header.html')
+def header(request, view_name):
+    return {'view_name': view_name}
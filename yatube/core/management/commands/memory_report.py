@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.memory import format_report, memory_report, start_tracing
+
+
+class Command(BaseCommand):
+    help = (
+        'Запрашивает --url --repeat раз внутри процесса и показывает, '
+        'где выделялась память, её прирост и объекты по типам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', default=[])
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--limit', type=int, default=settings.MEMORY_REPORT_LIMIT
+        )
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        urls = options['url'] or ['/']
+        # Первый проход прогревает кэши и импорты, чтобы не считать их
+        for url in urls:
+            client.get(url)
+        start_tracing()
+        memory_report(options['limit'])
+        for _ in range(options['repeat']):
+            for url in urls:
+                client.get(url)
+        self.stdout.write(format_report(memory_report(options['limit'])))
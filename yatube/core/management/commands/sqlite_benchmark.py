@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_sqlite_pragmas
+
+SCHEMA = (
+    'CREATE TABLE comment ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'post_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL, '
+    'pub_date REAL NOT NULL)',
+    'CREATE INDEX comment_post_id ON comment (post_id, pub_date)',
+)
+READ_SQL = (
+    'SELECT id, text, pub_date FROM comment '
+    'WHERE post_id = ? ORDER BY pub_date DESC LIMIT 10'
+)
+WRITE_SQL = 'INSERT INTO comment (post_id, text, pub_date) VALUES (?, ?, ?)'
+# Таймаут sqlite3 по умолчанию, как у Django без OPTIONS
+DEFAULT_TIMEOUT = 5.0
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(
+        path, timeout=DEFAULT_TIMEOUT, isolation_level=None
+    )
+    apply_sqlite_pragmas(connection, pragmas)
+    return connection
+
+
+def worker(path, pragmas, is_writer, posts, deadline, results):
+    connection = connect(path, pragmas)
+    operations = errors = 0
+    while time.time() < deadline:
+        post_id = random.randint(1, posts)
+        try:
+            if is_writer:
+                connection.execute('BEGIN')
+                connection.execute(
+                    WRITE_SQL, (post_id, 'Комментарий', time.time())
+                )
+                connection.execute('COMMIT')
+            else:
+                connection.execute(READ_SQL, (post_id,)).fetchall()
+            operations += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    connection.close()
+    results.put((is_writer, operations, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с настройками '
+        'по умолчанию и с SQLITE_PRAGMAS при параллельных чтении и записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--posts', type=int, default=100)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('default', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        for name, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.prepare(path, options)
+                reads, writes, errors = self.run(path, pragmas, options)
+            duration = options['duration']
+            self.stdout.write(
+                f'{name:>15}: '
+                f'чтений/с {reads / duration:10.0f}  '
+                f'записей/с {writes / duration:8.0f}  '
+                f'ошибок блокировки {errors}'
+            )
+
+    def prepare(self, path, options):
+        connection = sqlite3.connect(path)
+        for sql in SCHEMA:
+            connection.execute(sql)
+        connection.executemany(
+            WRITE_SQL,
+            (
+                (random.randint(1, options['posts']), 'Комментарий', i)
+                for i in range(options['rows'])
+            )
+        )
+        connection.commit()
+        connection.close()
+
+    def run(self, path, pragmas, options):
+        # journal_mode хранится в файле БД, включаем его до старта
+        connect(path, pragmas).close()
+        results = multiprocessing.Queue()
+        deadline = time.time() + options['duration']
+        roles = (
+            [False] * options['readers'] + [True] * options['writers']
+        )
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(path, pragmas, is_writer, options['posts'],
+                      deadline, results),
+            )
+            for is_writer in roles
+        ]
+        for process in processes:
+            process.start()
+        reads = writes = errors = 0
+        for _ in processes:
+            is_writer, operations, worker_errors = results.get()
+            if is_writer:
+                writes += operations
+            else:
+                reads += operations
+            errors += worker_errors
+        for process in processes:
+            process.join()
+        return reads, writes, errors
@@ -0,0 +1,22 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики DATABASE_REPLICAS '
+        '(локальная замена репликации)'
+    )
+
+    def handle(self, *args, **options):
+        source = sqlite3.connect(connections['default'].settings_dict['NAME'])
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            source.backup(target)
+            target.close()
+            self.stdout.write(f'{alias}: скопирована основная база')
+        source.close()
@@ -0,0 +1,74 @@
+import gc
+import threading
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+
+_snapshots = {'previous': None}
+_lock = threading.Lock()
+
+
+def start_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+
+
+def stop_tracing():
+    tracemalloc.stop()
+    _snapshots['previous'] = None
+
+
+def object_counts(limit):
+    """Самые многочисленные типы объектов, отслеживаемых сборщиком."""
+    counts = Counter(
+        f'{type(obj).__module__}.{type(obj).__qualname__}'
+        for obj in gc.get_objects()
+    )
+    return counts.most_common(limit)
+
+
+def memory_report(limit):
+    """
+    Отчёт о памяти процесса: места с наибольшим числом выделений,
+    прирост с прошлого отчёта и число объектов по типам. Места
+    выделений есть, только пока включён tracemalloc.
+    """
+    report = {
+        'tracing': tracemalloc.is_tracing(),
+        'objects': object_counts(limit),
+        'top': [],
+        'growth': [],
+    }
+    if not report['tracing']:
+        return report
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    report['current'], report['peak'] = tracemalloc.get_traced_memory()
+    report['top'] = snapshot.statistics('lineno')[:limit]
+    with _lock:
+        previous, _snapshots['previous'] = _snapshots['previous'], snapshot
+    if previous is not None:
+        report['growth'] = snapshot.compare_to(previous, 'lineno')[:limit]
+    return report
+
+
+def format_report(report):
+    lines = []
+    if report['tracing']:
+        lines.append(
+            f'Отслеживается: {report["current"] / 1024:.1f} КиБ, '
+            f'пик {report["peak"] / 1024:.1f} КиБ'
+        )
+        lines.append('\nБольше всего выделено:')
+        lines += (str(stat) for stat in report['top'])
+        if report['growth']:
+            lines.append('\nПрирост с прошлого отчёта:')
+            lines += (str(stat) for stat in report['growth'])
+    else:
+        lines.append('tracemalloc выключен, места выделений не собираются')
+    lines.append('\nОбъекты по типам:')
+    lines += (f'{count:>10} {name}' for name, count in report['objects'])
+    return '\n'.join(lines)
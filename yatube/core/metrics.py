@@ -0,0 +1,218 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from .db import wrap_all_queries
+
+_current = threading.local()
+
+# Верхние границы корзин гистограмм
+HISTOGRAM_BUCKETS = {
+    'request_duration_seconds': (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+    'thumbnail_seconds': (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    'upload_bytes': (
+        10_000, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000,
+    ),
+}
+
+
+class RequestMetrics:
+    """Замеры одного запроса, собираются в потоке, который его выполняет."""
+
+    __slots__ = (
+        'queries', 'sql_time', 'template_time', 'template_depth',
+        'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def current_metrics():
+    """Замеры текущего запроса или None вне MetricsMiddleware."""
+    return getattr(_current, 'metrics', None)
+
+
+@contextmanager
+def collect_metrics():
+    """Собирает замеры запросов к БД, шаблонов и кэша внутри блока."""
+    metrics = RequestMetrics()
+    _current.metrics = metrics
+    try:
+        with wrap_all_queries(metrics.record_query):
+            yield metrics
+    finally:
+        _current.metrics = None
+
+
+@contextmanager
+def timed_template():
+    """Время рендеринга шаблона; вложенные шаблоны не считаются дважды."""
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+        return
+    metrics.template_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += time.perf_counter() - start
+
+
+def record_cache_lookup(hit):
+    metrics = current_metrics()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def request_view_name(request):
+    """
+    Имя URL запроса. Ответы из кэша страниц отдаются до роутинга,
+    для них URL разрешается отдельно.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unresolved'
+    return match.view_name
+
+
+class ViewStats:
+    """Накопленные замеры одного представления."""
+
+    __slots__ = (
+        'requests', 'wall_time', 'wall_time_max', 'queries', 'sql_time',
+        'template_time', 'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def add(self, wall_time, metrics):
+        self.requests += 1
+        self.wall_time += wall_time
+        self.wall_time_max = max(self.wall_time_max, wall_time)
+        self.queries += metrics.queries
+        self.sql_time += metrics.sql_time
+        self.template_time += metrics.template_time
+        self.cache_hits += metrics.cache_hits
+        self.cache_misses += metrics.cache_misses
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MetricsAggregator:
+    """
+    Сводка замеров по именам URL в памяти процесса. Запись запроса —
+    несколько сложений под блокировкой. Гистограммы хранят число
+    значений в каждой корзине HISTOGRAM_BUCKETS, за ними переполнение
+    и сумму значений.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.histograms = {}
+        self.flushed_at = 0
+
+    def record(self, view_name, status, wall_time, metrics):
+        with self.lock:
+            stats = self.views.get(view_name)
+            if stats is None:
+                stats = self.views[view_name] = ViewStats()
+            stats.add(wall_time, metrics)
+            self._observe(
+                'request_duration_seconds', wall_time,
+                view=view_name, status=str(status),
+            )
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            self._observe(name, value, **labels)
+
+    def _observe(self, name, value, **labels):
+        buckets = HISTOGRAM_BUCKETS[name]
+        key = (name, tuple(sorted(labels.items())))
+        values = self.histograms.get(key)
+        if values is None:
+            values = self.histograms[key] = [0] * (len(buckets) + 2)
+        values[bisect.bisect_left(buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: stats.as_dict() for name, stats in self.views.items()
+            }
+
+    def export(self):
+        """Сводка процесса в виде, пригодном для JSON."""
+        with self.lock:
+            return {
+                'views': {
+                    name: stats.as_dict()
+                    for name, stats in self.views.items()
+                },
+                'histograms': [
+                    [name, dict(labels), list(values)]
+                    for (name, labels), values in self.histograms.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        """
+        Раз в METRICS_FLUSH_INTERVAL секунд записывает сводку процесса
+        в METRICS_DIR, откуда /metrics собирает данные всех процессов.
+        """
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not directory or (not force and now - self.flushed_at < interval):
+            return
+        self.flushed_at = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.export(), file)
+        os.replace(temp_path, path)
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.histograms.clear()
+
+
+aggregator = MetricsAggregator()
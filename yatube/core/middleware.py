@@ -0,0 +1,204 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+from .db import wrap_all_queries
+from .metrics import aggregator, collect_metrics, request_view_name
+from .nplusone import NPlusOneDetector
+from .page_cache import (conditional_page_response, is_cacheable_request,
+                         is_cacheable_response, page_cache_key,
+                         request_content_version)
+from .page_holes import fill_holes
+from .profiler import StackSampler, should_profile
+from .routers import pin_to_primary, wrote_to_primary
+from .slow_queries import SlowQueryLogger
+
+
+class MetricsMiddleware:
+    """
+    Замеряет каждый запрос: время ответа, число и время SQL-запросов,
+    время рендеринга шаблонов, попадания и промахи кэша. Замеры
+    складываются в core.metrics.aggregator по имени URL, вместе с
+    размерами загруженных файлов. Стоит первым, чтобы учитывать и
+    ответы из кэша страниц.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+        aggregator.record(
+            request_view_name(request),
+            response.status_code,
+            time.perf_counter() - start,
+            metrics,
+        )
+        if request.content_type == 'multipart/form-data':
+            for _, files in request.FILES.lists():
+                for file in files:
+                    aggregator.observe('upload_bytes', file.size)
+        aggregator.flush()
+        return response
+
+
+class SamplingProfilerMiddleware:
+    """
+    Снимает стеки доли запросов, заданной в админке
+    (/admin/profiler/), или одного запроса с подписанным заголовком
+    X-Profile. Стеки дописываются в PROFILER_DIR по имени URL.
+    Пока профилирование выключено, запрос только проверяет заголовок
+    и закэшированную в процессе долю.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+        sampler = StackSampler(
+            threading.get_ident(), settings.PROFILER_INTERVAL
+        )
+        with sampler:
+            response = self.get_response(request)
+        sampler.write(request_view_name(request))
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """
+    Пишет в лог core.slow_queries запросы к БД дольше
+    SLOW_QUERY_THRESHOLD секунд. Одинаковые по форме запросы пишутся
+    не чаще раза в SLOW_QUERY_SAMPLE_INTERVAL секунд.
+    """
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with wrap_all_queries(SlowQueryLogger(request)):
+            return self.get_response(request)
+
+
+class NPlusOneMiddleware:
+    """
+    Ищет N+1: SELECT одной формы, выполненный за запрос
+    NPLUSONE_THRESHOLD раз и больше. При NPLUSONE_MODE = 'log' пишет
+    в лог core.nplusone, где в шаблоне и коде случился повтор, при
+    'raise' падает с NPlusOneError (так работают тесты).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.NPLUSONE_MODE
+        if mode is None:
+            return self.get_response(request)
+        detector = NPlusOneDetector(settings.NPLUSONE_THRESHOLD)
+        with wrap_all_queries(detector):
+            response = self.get_response(request)
+        detector.check(request_view_name(request), mode)
+        return response
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Отдаёт анонимным пользователям готовые страницы из кэша.
+    Стоит перед SessionMiddleware, поэтому при попадании в кэш
+    сессии, аутентификация, роутинг и шаблоны не выполняются.
+    Запросы с cookie (в том числе сессионной) кэш обходят.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.COOKIES or not is_cacheable_request(request):
+            return self.get_response(request)
+
+        key = page_cache_key(request, request_content_version(request))
+        response = cache.get(key)
+        if response is not None:
+            return conditional_page_response(request, response)
+
+        response = self.get_response(request)
+        if is_cacheable_response(request, response):
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+
+class PersonalPageCacheMiddleware:
+    """
+    Общий кэш страниц для пользователей с cookie.
+    Страница рендерится один раз с метками на месте персональных
+    фрагментов (шапка, кнопка подписки, форма комментария),
+    метки заполняются для каждого запроса отдельно.
+    Стоит после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_cacheable_request(request):
+            return self.get_response(request)
+
+        key = page_cache_key(
+            request, request_content_version(request), prefix='page_holes'
+        )
+        response = cache.get(key)
+        if response is None:
+            request.page_holes = True
+            response = self.get_response(request)
+            if is_cacheable_response(request, response):
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+        else:
+            response = conditional_page_response(request, response)
+
+        if not response.streaming and b'<!--hole:' in response.content:
+            content = response.content.decode(response.charset)
+            response.content = fill_holes(request, content)
+        return response
+
+
+class ReplicaStickyMiddleware:
+    """
+    После записи пользователь REPLICA_STICKY_SECONDS читает из основной
+    базы и видит свои изменения, даже если реплики отстают. Время
+    последней записи хранится в cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pin_to_primary(self.wrote_recently(request))
+        try:
+            response = self.get_response(request)
+            if wrote_to_primary():
+                response.set_cookie(
+                    settings.REPLICA_STICKY_COOKIE,
+                    str(time.time()),
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                )
+        finally:
+            pin_to_primary(False)
+        return response
+
+    def wrote_recently(self, request):
+        try:
+            last_write = float(
+                request.COOKIES.get(settings.REPLICA_STICKY_COOKIE, 0)
+            )
+        except ValueError:
+            return False
+        return time.time() - last_write < settings.REPLICA_STICKY_SECONDS
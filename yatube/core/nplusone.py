@@ -0,0 +1,89 @@
+import logging
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.template.base import Node
+
+from . import metrics, slow_queries
+from .slow_queries import query_shape
+
+logger = logging.getLogger(__name__)
+
+# Обёртки execute_wrapper, их кадры не считаются местом запроса
+WRAPPER_FILES = {__file__, metrics.__file__, slow_queries.__file__}
+
+
+class NPlusOneError(Exception):
+    """Запрос выполнил один и тот же SELECT слишком много раз."""
+
+
+def query_origin():
+    """
+    Где выполняется запрос: узел шаблона и строка кода проекта.
+    Вызывается один раз на повторяющуюся форму запроса.
+    """
+    template = code = None
+    frame = sys._getframe(1)
+    while frame is not None and not (template and code):
+        filename = frame.f_code.co_filename
+        if template is None and frame.f_code is Node.render_annotated.__code__:
+            node = frame.f_locals['self']
+            template = f'{node.origin.name}:{node.token.lineno}'
+        elif (
+            code is None
+            and filename.startswith(settings.BASE_DIR)
+            and filename not in WRAPPER_FILES
+        ):
+            code = f'{filename}:{frame.f_lineno} в {frame.f_code.co_name}'
+        frame = frame.f_back
+    return template, code
+
+
+class NPlusOneDetector:
+    """
+    Обёртка execute_wrapper: считает SELECT по формам запроса и
+    запоминает, откуда форма выполнилась threshold-й раз.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if self.is_tracked(sql, many):
+            shape = query_shape(sql)
+            self.counts[shape] += 1
+            if self.counts[shape] == self.threshold:
+                self.origins[shape] = query_origin()
+        return result
+
+    def is_tracked(self, sql, many):
+        if many or sql.lstrip()[:6].upper() != 'SELECT':
+            return False
+        return not any(
+            f'FROM "{table}"' in sql
+            for table in settings.NPLUSONE_IGNORED_TABLES
+        )
+
+    def report(self):
+        lines = []
+        for shape, (template, code) in self.origins.items():
+            lines.append(
+                f'{self.counts[shape]} раз: {shape}\n'
+                f'  шаблон: {template or "-"}\n'
+                f'  код: {code or "-"}'
+            )
+        return '\n'.join(lines)
+
+    def check(self, view_name, mode):
+        """Падает или пишет в лог, если нашлись повторы."""
+        report = self.report()
+        if not report:
+            return
+        message = f'N+1 в {view_name}:\n{report}'
+        if mode == 'raise':
+            raise NPlusOneError(message)
+        logger.warning(message)
@@ -0,0 +1,96 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+PAGE_CACHE_VERSION_KEY = 'page_cache:version'
+
+
+def get_content_version():
+    """Текущая версия контента, общая для всех закэшированных страниц."""
+    version = cache.get(PAGE_CACHE_VERSION_KEY)
+    if version is None:
+        version = bump_content_version()
+    return version
+
+
+def bump_content_version():
+    """
+    Инвалидирует все закэшированные страницы сменой версии.
+    Версия строится от времени, поэтому после вытеснения ключа
+    из кэша старые страницы не оживают.
+    """
+    version = time.time_ns()
+    cache.set(PAGE_CACHE_VERSION_KEY, version, None)
+    return version
+
+
+def request_content_version(request):
+    """Версия контента, зафиксированная на время обработки запроса."""
+    if not hasattr(request, 'content_version'):
+        request.content_version = get_content_version()
+    return request.content_version
+
+
+def content_etag(request, *args, **kwargs):
+    """ETag страницы: версия контента и текущий пользователь."""
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else ''
+    return f'{request_content_version(request)}-{user_id}'
+
+
+# Условный GET: 304 Not Modified до выполнения запросов и рендеринга.
+# Только по ETag: Last-Modified с точностью до секунды и без
+# пользователя отдал бы 304 на изменение в ту же секунду и на чужую
+# персональную страницу
+content_condition = condition(etag_func=content_etag)
+
+
+def conditional_page_response(request, response):
+    """
+    Проставляет ETag странице из кэша, ETag первого рендеринга
+    принадлежит другому пользователю. Возвращает 304, если клиент
+    прислал актуальный ETag.
+    """
+    etag = quote_etag(content_etag(request))
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def page_cache_key(request, version, prefix='page_cache'):
+    url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{prefix}:{version}:{url}'
+
+
+def is_cacheable_request(request):
+    """Кэшируются только GET/HEAD запросы."""
+    return (
+        settings.PAGE_CACHE_TIMEOUT
+        and request.method in ('GET', 'HEAD')
+    )
+
+
+def may_read_lagging_replica(request):
+    """Контент изменился недавно, реплики могли ещё не догнать."""
+    age = time.time_ns() - request_content_version(request)
+    return (
+        settings.DATABASE_REPLICAS
+        and age < settings.REPLICA_STICKY_SECONDS * 10**9
+    )
+
+
+def is_cacheable_response(request, response):
+    resolver_match = getattr(request, 'resolver_match', None)
+    return (
+        request.method == 'GET'
+        and not may_read_lagging_replica(request)
+        and resolver_match is not None
+        and resolver_match.view_name in settings.PAGE_CACHE_VIEWS
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
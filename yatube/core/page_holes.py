@@ -0,0 +1,40 @@
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.template.loader import render_to_string
+
+HOLE_RE = re.compile(r'<!--hole:(\w+)\?([^>]*)-->')
+
+_holes = {}
+
+
+def register_hole(name, template_name):
+    """
+    Регистрирует персональный фрагмент страницы.
+    Функция получает request и параметры фрагмента и возвращает
+    контекст для шаблона.
+    """
+    def decorator(func):
+        _holes[name] = (template_name, func)
+        return func
+    return decorator
+
+
+def render_hole(request, name, params):
+    template_name, get_context = _holes[name]
+    return render_to_string(
+        template_name, get_context(request, **params), request=request
+    )
+
+
+def hole_placeholder(name, params):
+    return f'<!--hole:{name}?{urlencode(params)}-->'
+
+
+def fill_holes(request, content):
+    """Второй проход: подставляет в общую страницу фрагменты для request."""
+    def replace(match):
+        name, params = match.groups()
+        params = dict(parse_qsl(params, keep_blank_values=True))
+        return render_hole(request, name, params)
+    return HOLE_RE.sub(replace, content)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+PROFILER_RATE_FILE = 'sample_rate'
+PROFILER_TOKENS_DIR = 'used_tokens'
+PROFILER_TOKEN_SALT = 'core.profiler'
+PROFILER_HEADER = 'HTTP_X_PROFILE'
+
+_switch = {'rate': 0.0, 'checked_at': None}
+
+
+def set_sample_rate(rate):
+    """
+    Доля профилируемых запросов. Пишется в файл в PROFILER_DIR, его
+    читают все процессы сервера: кэш у каждого процесса свой.
+    """
+    os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILER_DIR, PROFILER_RATE_FILE)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as file:
+        file.write(str(rate))
+    os.replace(temp_path, path)
+    _switch['checked_at'] = None
+
+
+def get_sample_rate():
+    """
+    Доля профилируемых запросов. Процесс перечитывает её из файла не
+    чаще раза в PROFILER_SWITCH_TTL секунд.
+    """
+    now = time.monotonic()
+    checked_at = _switch['checked_at']
+    if checked_at is None or now - checked_at >= settings.PROFILER_SWITCH_TTL:
+        path = os.path.join(settings.PROFILER_DIR, PROFILER_RATE_FILE)
+        try:
+            with open(path) as file:
+                _switch['rate'] = float(file.read())
+        except (OSError, ValueError):
+            _switch['rate'] = 0.0
+        _switch['checked_at'] = now
+    return _switch['rate']
+
+
+def make_profile_token():
+    """Значение заголовка X-Profile, включающее профилирование запроса."""
+    return signing.dumps(random.getrandbits(64), salt=PROFILER_TOKEN_SALT)
+
+
+def forget_expired_tokens(directory):
+    """Удаляет отметки токенов, которые и так уже просрочены."""
+    expired = time.time() - settings.PROFILER_TOKEN_MAX_AGE
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < expired:
+                os.remove(entry.path)
+        except OSError:
+            continue
+
+
+def use_profile_token(token):
+    """
+    Проверяет подпись и срок токена. Каждый токен срабатывает один
+    раз во всех процессах: использованный отмечается файлом в
+    PROFILER_DIR, созданным атомарно.
+    """
+    try:
+        signing.loads(
+            token,
+            salt=PROFILER_TOKEN_SALT,
+            max_age=settings.PROFILER_TOKEN_MAX_AGE,
+        )
+    except signing.BadSignature:
+        return False
+    directory = os.path.join(settings.PROFILER_DIR, PROFILER_TOKENS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    forget_expired_tokens(directory)
+    name = hashlib.sha256(token.encode()).hexdigest()
+    try:
+        open(os.path.join(directory, name), 'x').close()
+    except FileExistsError:
+        return False
+    return True
+
+
+def should_profile(request):
+    token = request.META.get(PROFILER_HEADER)
+    if token:
+        return use_profile_token(token)
+    rate = get_sample_rate()
+    return bool(rate) and random.random() < rate
+
+
+def collapse(frame):
+    """Стек в формате collapsed stacks: корень первым, через «;»."""
+    names = []
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '?')
+        # co_qualname (Python 3.11+) отличает методы разных классов
+        code = frame.f_code
+        names.append(f'{module}:{getattr(code, "co_qualname", code.co_name)}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """
+    Раз в interval секунд снимает стек потока thread_id из отдельного
+    потока и считает одинаковые стеки.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name='stack-sampler', daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            self.stacks[collapse(frame)] += 1
+
+    def write(self, view_name):
+        """
+        Дописывает стеки в PROFILER_DIR/<view_name>.collapsed, файл
+        читают flamegraph.pl и speedscope.
+        """
+        if not self.stacks:
+            return
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.PROFILER_DIR, f'{view_name.replace(":", ".")}.collapsed'
+        )
+        lines = ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items()
+        )
+        with open(path, 'a') as file:
+            file.write(lines)
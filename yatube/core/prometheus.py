@@ -0,0 +1,154 @@
+import glob
+import json
+import os
+
+from django.conf import settings
+
+from .metrics import HISTOGRAM_BUCKETS, aggregator
+
+PREFIX = 'yatube_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HISTOGRAM_HELP = {
+    'request_duration_seconds': 'Время ответа по имени URL и статусу',
+    'thumbnail_seconds': 'Время создания миниатюры',
+    'upload_bytes': 'Размер загруженного файла',
+}
+# Счётчики по представлениям: поле ViewStats, имя метрики, описание
+VIEW_COUNTERS = (
+    ('queries', 'db_queries_total', 'Число SQL-запросов'),
+    ('sql_time', 'db_query_seconds_total', 'Время SQL-запросов'),
+    ('template_time', 'template_render_seconds_total',
+     'Время рендеринга шаблонов'),
+)
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        pass
+    return True
+
+
+def stale_export(path):
+    """
+    Сводка умершего процесса: её итоги в /metrics больше не попадают.
+    Сводку живого процесса не трогаем, даже если он давно молчит:
+    иначе его счётчики в /metrics уменьшились бы.
+    """
+    try:
+        pid = int(os.path.basename(path)[:-len('.json')])
+    except ValueError:
+        return True
+    return not process_alive(pid)
+
+
+def read_exports():
+    """
+    Сводки живых процессов из METRICS_DIR или только текущего.
+    Сводки умерших процессов удаляются.
+    """
+    if not settings.METRICS_DIR:
+        return [aggregator.export()]
+    aggregator.flush(force=True)
+    exports = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        if stale_export(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as file:
+                exports.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return exports
+
+
+def merge_exports(exports):
+    """Складывает сводки процессов, максимумы берутся наибольшие."""
+    views = {}
+    histograms = {}
+    for export in exports:
+        for name, stats in export['views'].items():
+            total = views.setdefault(name, dict.fromkeys(stats, 0))
+            for field, value in stats.items():
+                if field.endswith('_max'):
+                    total[field] = max(total[field], value)
+                else:
+                    total[field] += value
+        for name, labels, values in export['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            total = histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(values):
+                total[index] += value
+    return views, histograms
+
+
+def format_labels(labels):
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def family(name, kind, help_text):
+    return [
+        f'# HELP {PREFIX}{name} {help_text}',
+        f'# TYPE {PREFIX}{name} {kind}',
+    ]
+
+
+def histogram_lines(name, buckets, histograms):
+    lines = family(name, 'histogram', HISTOGRAM_HELP[name])
+    bounds = [*map(str, buckets), '+Inf']
+    for (metric, labels), values in sorted(histograms.items()):
+        if metric != name:
+            continue
+        cumulative = 0
+        for bound, count in zip(bounds, values):
+            cumulative += count
+            bucket_labels = format_labels((*labels, ('le', bound)))
+            lines.append(f'{PREFIX}{name}_bucket{bucket_labels} {cumulative}')
+        labels = format_labels(labels)
+        lines.append(f'{PREFIX}{name}_sum{labels} {values[-1]}')
+        lines.append(f'{PREFIX}{name}_count{labels} {cumulative}')
+    return lines
+
+
+def cache_lines(views):
+    lines = family('cache_lookups_total', 'counter', 'Обращения к кэшу')
+    ratios = family('cache_hit_ratio', 'gauge', 'Доля попаданий в кэш')
+    for view, stats in sorted(views.items()):
+        hits, misses = stats['cache_hits'], stats['cache_misses']
+        for result, count in (('hit', hits), ('miss', misses)):
+            labels = format_labels((('view', view), ('result', result)))
+            lines.append(f'{PREFIX}cache_lookups_total{labels} {count}')
+        if hits + misses:
+            labels = format_labels((('view', view),))
+            ratios.append(
+                f'{PREFIX}cache_hit_ratio{labels} {hits / (hits + misses)}'
+            )
+    return lines + ratios
+
+
+def render_metrics(views, histograms):
+    """Текстовый формат Prometheus для сводки merge_exports."""
+    lines = []
+    for name, buckets in HISTOGRAM_BUCKETS.items():
+        lines += histogram_lines(name, buckets, histograms)
+    for field, name, help_text in VIEW_COUNTERS:
+        lines += family(name, 'counter', help_text)
+        for view, stats in sorted(views.items()):
+            labels = format_labels((('view', view),))
+            lines.append(f'{PREFIX}{name}{labels} {stats[field]}')
+    lines += cache_lines(views)
+    return '\n'.join(lines) + '\n'
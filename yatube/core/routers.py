@@ -0,0 +1,131 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .sharding import shard_for, sharded_field
+
+_replica_state = threading.local()
+
+
+def pin_to_primary(pinned=True):
+    """Чтения текущего потока идут в основную базу."""
+    _replica_state.pinned = pinned
+    _replica_state.wrote = False
+
+
+def mark_primary_write():
+    """Запись в реплицируемые таблицы: дальше поток читает основную базу."""
+    _replica_state.pinned = True
+    _replica_state.wrote = True
+
+
+def wrote_to_primary():
+    return getattr(_replica_state, 'wrote', False)
+
+
+class AppDatabaseRouter:
+    """
+    Направляет модели приложений в базы из DATABASE_APPS_MAPPING
+    (app_label -> alias). Таблицы остальных приложений в эти базы
+    не мигрируются.
+    """
+
+    def _db_for_app(self, app_label):
+        return settings.DATABASE_APPS_MAPPING.get(app_label)
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_app(model._meta.app_label)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_app(model._meta.app_label)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        mapped_db = self._db_for_app(app_label)
+        if mapped_db is not None:
+            return db == mapped_db
+        if db in settings.DATABASE_APPS_MAPPING.values():
+            return False
+        return None
+
+
+class ReplicaRouter:
+    """
+    Читает модели DATABASE_REPLICA_APPS из случайной реплики
+    DATABASE_REPLICAS, пишет в основную базу. Поток, закреплённый
+    за основной базой (см. ReplicaStickyMiddleware), читает из неё.
+    """
+
+    def _is_replicated(self, model):
+        return (
+            settings.DATABASE_REPLICAS
+            and model._meta.app_label in settings.DATABASE_REPLICA_APPS
+        )
+
+    def db_for_read(self, model, **hints):
+        if (
+            not self._is_replicated(model)
+            or getattr(_replica_state, 'pinned', False)
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if self._is_replicated(model):
+            mark_primary_write()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ShardRouter:
+    """
+    Раскладывает строки моделей DATABASE_SHARDED_MODELS по шардам
+    DATABASE_SHARDS по значению ключевого поля. Шард определяется
+    по объекту из подсказки instance: самой строке или объекту, на
+    который указывает ключ (post.comments, user.follower).
+    """
+
+    def _db(self, model, instance):
+        field = sharded_field(model)
+        if not settings.DATABASE_SHARDS or instance is None:
+            return None
+        if not field:
+            # Связи из строк шарда ведут в основную базу
+            if instance._state.db in settings.DATABASE_SHARDS:
+                return DEFAULT_DB_ALIAS
+            return None
+        if isinstance(instance, model):
+            return shard_for(getattr(instance, field.attname))
+        if isinstance(instance, field.related_model):
+            return shard_for(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if sharded_field(obj1) or sharded_field(obj2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in settings.DATABASE_SHARDS:
+            return None
+        label = f'{app_label}.{model_name}'
+        return model_name is not None and (
+            label in settings.DATABASE_SHARDED_MODELS
+        )
@@ -0,0 +1,35 @@
+import heapq
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def shard_for(key):
+    """База шарда для ключа, без DATABASE_SHARDS — основная база."""
+    shards = settings.DATABASE_SHARDS
+    if not shards:
+        return DEFAULT_DB_ALIAS
+    return shards[int(key) % len(shards)]
+
+
+def sharded_field(model):
+    """Поле-ключ шардирования модели из DATABASE_SHARDED_MODELS."""
+    name = settings.DATABASE_SHARDED_MODELS.get(model._meta.label_lower)
+    return name and model._meta.get_field(name)
+
+
+def scatter_gather(queryset, limit):
+    """
+    Выполняет queryset на каждом шарде и сливает результаты в порядке
+    его сортировки (по первому полю ordering). Возвращает первые limit.
+    """
+    shards = settings.DATABASE_SHARDS or [DEFAULT_DB_ALIAS]
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    field = ordering[0].lstrip('-')
+    results = (list(queryset.using(db)[:limit]) for db in shards)
+    merged = heapq.merge(
+        *results,
+        key=lambda obj: getattr(obj, field),
+        reverse=ordering[0].startswith('-'),
+    )
+    return [obj for obj, _ in zip(merged, range(limit))]
@@ -0,0 +1,102 @@
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import request_view_name
+
+logger = logging.getLogger(__name__)
+
+# Списки IN (%s, %s, ...) разной длины дают одну форму запроса
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+# Сколько форм запросов помнит сэмплер, прежде чем начать заново
+MAX_SHAPES = 1000
+
+
+def query_shape(sql):
+    """Форма запроса: текст SQL без различий в длине списков IN."""
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+class ShapeSampler:
+    """
+    Пропускает запись о форме запроса не чаще раза в interval секунд
+    и считает пропущенные повторы.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.shapes = {}
+
+    def sample(self, shape, interval):
+        """Число пропущенных повторов или None, если писать рано."""
+        now = time.monotonic()
+        with self.lock:
+            logged_at, skipped = self.shapes.get(shape, (None, 0))
+            if logged_at is not None and now - logged_at < interval:
+                self.shapes[shape] = (logged_at, skipped + 1)
+                return None
+            if len(self.shapes) >= MAX_SHAPES:
+                self.shapes.clear()
+            self.shapes[shape] = (now, 0)
+            return skipped
+
+
+sampler = ShapeSampler()
+
+
+def explain(connection, sql, params):
+    """План выполнения SELECT-запроса, например EXPLAIN QUERY PLAN SQLite."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+
+
+class SlowQueryLogger:
+    """
+    Обёртка execute_wrapper: пишет в лог запросы дольше
+    SLOW_QUERY_THRESHOLD секунд с представлением, параметрами и планом.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if (
+                duration >= settings.SLOW_QUERY_THRESHOLD
+                and not self.explaining
+            ):
+                self.log(sql, params, many, context, duration)
+
+    def log(self, sql, params, many, context, duration):
+        skipped = sampler.sample(
+            query_shape(sql), settings.SLOW_QUERY_SAMPLE_INTERVAL
+        )
+        if skipped is None:
+            return
+        plan = None
+        if not many:
+            self.explaining = True
+            try:
+                plan = explain(context['connection'], sql, params)
+            except Exception as error:
+                plan = f'не удалось получить план: {error}'
+            finally:
+                self.explaining = False
+        logger.warning(
+            'Медленный запрос %.3f с в %s (похожих пропущено: %d)\n'
+            '%s\nПараметры: %r\nПлан:\n%s',
+            duration, request_view_name(self.request), skipped,
+            sql, params, plan,
+        )
@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.page_holes import hole_placeholder, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """
+    Персональный фрагмент страницы. При рендеринге страницы для
+    общего кэша вместо фрагмента выводится метка-заглушка.
+    """
+    request = context['request']
+    if getattr(request, 'page_holes', False):
+        return mark_safe(hole_placeholder(name, params))
+    return render_hole(request, name, params)
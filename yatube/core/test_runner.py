@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class NPlusOneTestRunner(DiscoverRunner):
+    """
+    Тесты падают на N+1 запросах в представлениях и не пишут сводки
+    метрик в общий METRICS_DIR.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.NPLUSONE_MODE = 'raise'
+        settings.METRICS_DIR = None
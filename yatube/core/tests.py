@@ -1,6 +1,43 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
 from http import HTTPStatus
+from io import StringIO
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.db import cached_count, estimate_count, wrap_all_queries
+from core.memory import stop_tracing
+from core.metrics import aggregator
+from core.middleware import ReplicaStickyMiddleware
+from core.nplusone import NPlusOneDetector, NPlusOneError
+from core.profiler import (StackSampler, get_sample_rate, make_profile_token,
+                           set_sample_rate, should_profile, use_profile_token)
+from core.routers import (AppDatabaseRouter, ReplicaRouter, ShardRouter,
+                          pin_to_primary)
+from core.sharding import shard_for
+from core.slow_queries import ShapeSampler, query_shape, sampler
+from core.writer import get_write_queue
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+SQLITE_SYNCHRONOUS_NORMAL = 1
 
 
 class ViewTestClass(TestCase):
@@ -12,3 +49,602 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:profile', kwargs={'username': self.user})
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторный анонимный запрос отдаётся без рендеринга шаблона."""
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertTemplateUsed(first, 'posts/profile.html')
+        self.assertIsNone(second.context)
+        self.assertEqual(first.content, second.content)
+
+    def test_query_string_is_part_of_key(self):
+        """Разные query string кэшируются отдельно."""
+        self.client.get(self.url)
+        response = self.client.get(self.url + '?page=2')
+        self.assertTemplateUsed(response, 'posts/profile.html')
+
+    def test_cache_invalidated_on_content_change(self):
+        """Изменение контента сбрасывает кэш страниц."""
+        self.client.get(self.url)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, 'posts/profile.html')
+        self.assertContains(response, 'Новый пост')
+
+    def test_authorized_user_bypasses_anonymous_cache(self):
+        """Запросы с сессионной cookie не получают анонимную страницу."""
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        self.client.get(self.url)
+        response = authorized_client.get(self.url)
+        self.assertContains(response, f'Пользователь: {self.user.username}')
+
+
+class PersonalPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_page_shared_between_users(self):
+        """Страница рендерится один раз, фрагменты для каждого свои."""
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        self.author_client.get(url)
+        response = self.reader_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/profile.html')
+        self.assertTemplateUsed(response, 'posts/includes/follow_button.html')
+        self.assertContains(response, f'Пользователь: {self.reader}')
+        self.assertContains(response, 'Отписаться')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_post_detail_personal_fragments(self):
+        """Кнопка редактирования видна только автору закэшированного поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.id})
+        self.reader_client.get(url)
+        response = self.author_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.reader_client.get(url)
+        self.assertNotContains(response, edit_url)
+
+
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        aggregator.reset()
+
+    def test_request_metrics_aggregated_by_url_name(self):
+        """Замеры запросов копятся по имени URL."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.client.get(url)
+        self.client.get(url)
+        stats = aggregator.snapshot()['posts:profile']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreater(stats['queries'], 0)
+        self.assertGreater(stats['template_time'], 0)
+        self.assertGreaterEqual(stats['wall_time'], stats['sql_time'])
+        # Второй запрос отдан из кэша страниц
+        self.assertGreater(stats['cache_hits'], 0)
+        self.assertGreater(stats['cache_misses'], 0)
+
+    def test_unknown_url(self):
+        """Запросы к несуществующим адресам собираются отдельно."""
+        self.client.get('/nonexist-page/')
+        self.assertEqual(aggregator.snapshot()['unresolved']['requests'], 1)
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        aggregator.reset()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        override = self.settings(METRICS_DIR=self.metrics_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_metrics_of_all_processes_merged(self):
+        """Сводки других процессов из METRICS_DIR складываются."""
+        self.client.get(reverse('posts:index'))
+        local_hits = aggregator.snapshot()['posts:index']['cache_hits']
+        other_process = {
+            'views': {'posts:index': {
+                'requests': 2, 'wall_time': 0.2, 'wall_time_max': 0.1,
+                'queries': 5, 'sql_time': 0.01, 'template_time': 0.05,
+                'cache_hits': 3, 'cache_misses': 1,
+            }},
+            'histograms': [[
+                'request_duration_seconds',
+                {'view': 'posts:index', 'status': '200'},
+                [0] * 5 + [2] + [0] * 6 + [0.2],
+            ]],
+        }
+        with open(os.path.join(self.metrics_dir, '1.json'), 'w') as file:
+            json.dump(other_process, file)
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        lines = response.content.decode().splitlines()
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{status="200",view="posts:index"} 3',
+            lines,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{status="200",view="posts:index",le="+Inf"} 3',
+            lines,
+        )
+        self.assertIn(
+            'yatube_cache_lookups_total{view="posts:index",result="hit"} '
+            f'{local_hits + 3}',
+            lines,
+        )
+
+    def test_dead_exports_dropped(self):
+        """Сводки умерших процессов удаляются, молчащих живых — нет."""
+        export = {'views': {'posts:index': {
+            'requests': 5, 'wall_time': 0.5, 'wall_time_max': 0.1,
+            'queries': 5, 'sql_time': 0.01, 'template_time': 0.05,
+            'cache_hits': 0, 'cache_misses': 0,
+        }}, 'histograms': []}
+        # Номер больше любого pid_max: такого процесса нет
+        dead = os.path.join(self.metrics_dir, '999999999.json')
+        silent = os.path.join(self.metrics_dir, '1.json')
+        for path in (dead, silent):
+            with open(path, 'w') as file:
+                json.dump(export, file)
+        # Процесс 1 жив, хоть сводка и не обновлялась сутки
+        past = time.time() - 24 * 60 * 60
+        os.utime(silent, (past, past))
+
+        content = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_db_queries_total{view="posts:index"} 5', content
+        )
+        self.assertFalse(os.path.exists(dead))
+        self.assertTrue(os.path.exists(silent))
+
+    def test_upload_sizes_recorded(self):
+        """Размеры загруженных файлов попадают в гистограмму."""
+        user = User.objects.create_user(username='author')
+        self.client.force_login(user)
+        upload = SimpleUploadedFile('notes.txt', b'x' * 100)
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': upload}
+        )
+        content = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('yatube_upload_bytes_sum{} 100', content)
+
+    def test_metrics_closed_for_other_addresses(self):
+        """Метрики доступны только с METRICS_ALLOWED_IPS."""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='192.0.2.1'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        sampler.shapes.clear()
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_slow_query_logged_with_view_and_plan(self):
+        """В журнал попадают представление, параметры и план запроса."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            self.client.get(url)
+        posts_query = next(
+            line for line in logs.output if 'FROM "posts_post"' in line
+        )
+        self.assertIn('posts:profile', posts_query)
+        self.assertIn('План:\n', posts_query)
+        self.assertRegex(posts_query, r'(SCAN|SEARCH)')
+
+    def test_same_shape_sampled(self):
+        """Повторы одной формы запроса пишутся раз в интервал."""
+        shape = query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s)')
+        self.assertEqual(
+            shape, query_shape('SELECT * FROM t WHERE id IN (%s)')
+        )
+        shapes = ShapeSampler()
+        self.assertEqual(shapes.sample(shape, 60), 0)
+        self.assertIsNone(shapes.sample(shape, 60))
+        self.assertIsNone(shapes.sample(shape, 60))
+        self.assertEqual(shapes.sample(shape, 0), 2)
+
+
+class NPlusOneDetectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.bulk_create(
+            Post(author=User.objects.create_user(username=f'author{i}'),
+                 text='Тестовый пост')
+            for i in range(3)
+        )
+
+    def test_repeated_query_reported_with_origin(self):
+        """Повторяющийся запрос находится вместе с местом в коде."""
+        detector = NPlusOneDetector(threshold=3)
+        with wrap_all_queries(detector):
+            authors = [post.author for post in Post.objects.all()]
+        self.assertEqual(len(authors), 3)
+        with self.assertRaisesRegex(NPlusOneError, r'core/tests\.py:\d+'):
+            detector.check('test', 'raise')
+        with self.assertLogs('core.nplusone', 'WARNING'):
+            detector.check('test', 'log')
+
+    def test_select_related_passes(self):
+        """С select_related повторов нет."""
+        detector = NPlusOneDetector(threshold=3)
+        with wrap_all_queries(detector):
+            list(Post.objects.select_related('author'))
+        self.assertEqual(detector.report(), '')
+
+
+class SamplingProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir, ignore_errors=True)
+        override = self.settings(PROFILER_DIR=self.profiles_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def tearDown(self):
+        set_sample_rate(0)
+
+    def test_switch_only_for_superuser(self):
+        """Долю профилируемых запросов меняет только администратор."""
+        url = reverse('profiler_switch')
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.client.post(url, {'sample_rate': 1})
+        self.assertFalse(should_profile(self.factory.get('/')))
+
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        self.client.post(url, {'sample_rate': 1})
+        self.assertTrue(should_profile(self.factory.get('/')))
+
+    def test_signed_header_profiles_one_request(self):
+        """Подписанный заголовок срабатывает один раз."""
+        token = make_profile_token()
+        self.assertTrue(should_profile(
+            self.factory.get('/', HTTP_X_PROFILE=token)
+        ))
+        self.assertFalse(should_profile(
+            self.factory.get('/', HTTP_X_PROFILE=token)
+        ))
+        self.assertFalse(should_profile(
+            self.factory.get('/', HTTP_X_PROFILE=token + 'x')
+        ))
+
+    def test_switch_shared_through_file(self):
+        """Доля читается из файла, а не из кэша процесса."""
+        set_sample_rate(1)
+        cache.clear()
+        self.assertEqual(get_sample_rate(), 1)
+        path = os.path.join(self.profiles_dir, 'sample_rate')
+        with open(path, 'w') as file:
+            file.write('0')
+        with self.settings(PROFILER_SWITCH_TTL=0):
+            self.assertEqual(get_sample_rate(), 0)
+
+    def test_used_token_remembered_without_cache(self):
+        """Использованный токен не срабатывает и после сброса кэша."""
+        token = make_profile_token()
+        self.assertTrue(use_profile_token(token))
+        cache.clear()
+        self.assertFalse(use_profile_token(token))
+
+    def test_sampled_stacks_written_per_view(self):
+        """Стеки запроса дописываются в файл представления."""
+        with StackSampler(threading.get_ident(), 0.001) as sampler:
+            time.sleep(0.05)
+        sampler.write('posts:index')
+        path = os.path.join(self.profiles_dir, 'posts.index.collapsed')
+        with open(path) as file:
+            content = file.read()
+        self.assertIn(
+            'test_sampled_stacks_written_per_view ', content
+        )
+
+
+class MemoryDiagnosticsTests(TestCase):
+    def tearDown(self):
+        stop_tracing()
+
+    def test_view_for_superuser_only(self):
+        """Отчёт о памяти видит только администратор."""
+        url = reverse('memory_diagnostics')
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.FOUND)
+
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        self.client.post(url, {'action': 'start'})
+        self.assertTrue(tracemalloc.is_tracing())
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertContains(response, 'Больше всего выделено')
+        self.assertContains(response, 'Прирост с прошлого отчёта')
+        self.assertContains(response, 'builtins.dict')
+
+    def test_command_reports_growth(self):
+        """Команда показывает прирост памяти за повторные запросы."""
+        out = StringIO()
+        call_command(
+            'memory_report', url=[reverse('posts:index')], repeat=2,
+            limit=5, stdout=out,
+        )
+        self.assertIn('Прирост с прошлого отчёта', out.getvalue())
+        self.assertIn('Объекты по типам', out.getvalue())
+
+
+class SQLitePragmasTests(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        """Настройки SQLITE_PRAGMAS применяются к соединению."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            busy_timeout = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+        self.assertEqual(busy_timeout, settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(synchronous, SQLITE_SYNCHRONOUS_NORMAL)
+
+
+@override_settings(COUNT_EXACT_LIMIT=3)
+class CachedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='counter')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(2)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_cached_by_query(self):
+        """
+        Повторный подсчёт берётся из кэша: смена контента его не
+        сбрасывает, новые записи видны после истечения ключа.
+        """
+        posts = Post.objects.filter(author=self.user)
+        self.assertEqual(cached_count(posts), 2)
+        Post.objects.create(text='Ещё пост', author=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_count(posts), 2)
+        cache.clear()
+        self.assertEqual(cached_count(posts), 3)
+
+    def test_filtered_large_count_capped_without_full_count(self):
+        """
+        Большой счётчик под фильтром не оценивается: берётся
+        COUNT_EXACT_LIMIT + 1 одним ограниченным COUNT.
+        """
+        writer = User.objects.create_user(username='writer')
+        for i in range(6):
+            Post.objects.create(text=f'Чужой {i}', author=self.user)
+            Post.objects.create(text=f'Свой {i}', author=writer)
+        posts = Post.objects.filter(author=writer)
+        self.assertIsNone(estimate_count(posts, 3))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(cached_count(posts), 4)
+        counts = [
+            query['sql'] for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT', counts[0])
+
+    def test_density_estimate_follows_gaps(self):
+        """Оценка всей таблицы учитывает дыры в ключах после удаления."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.user) for i in range(10)
+        )
+        pks = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        Post.objects.filter(pk__in=pks[1::2]).delete()
+        self.assertEqual(estimate_count(Post.objects.all(), 3), 6)
+        self.assertEqual(cached_count(Post.objects.all()), 6)
+        self.assertIsNone(estimate_count(Post.objects.all(), 6))
+
+
+@override_settings(WRITE_QUEUE_ENABLED=True)
+class WriteQueueTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_comment_written_by_queue(self):
+        """Комментарий сохраняется потоком-писателем."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий из очереди'},
+        )
+        self.assertTrue(
+            Comment.objects.filter(text='Комментарий из очереди').exists()
+        )
+
+    def test_failed_write_does_not_break_batch(self):
+        """Ошибка одной записи в пачке не откатывает остальные."""
+        write_queue = get_write_queue()
+        futures = [
+            write_queue.submit(
+                Comment.objects.create,
+                post=self.post, author=self.user, text=f'Комментарий {i}',
+            )
+            for i in range(3)
+        ]
+        failed = write_queue.submit(Comment.objects.create, post_id=0)
+        for future in futures:
+            future.result(settings.WRITE_QUEUE_TIMEOUT)
+        with self.assertRaises(IntegrityError):
+            failed.result(settings.WRITE_QUEUE_TIMEOUT)
+        self.assertEqual(Comment.objects.count(), len(futures))
+
+
+@override_settings(DATABASE_APPS_MAPPING={'sessions': 'sessions'})
+class AppDatabaseRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = AppDatabaseRouter()
+
+    def test_mapped_app_routed_to_own_database(self):
+        """Сессии читаются, пишутся и мигрируются в своей базе."""
+        self.assertEqual(self.router.db_for_read(Session), 'sessions')
+        self.assertEqual(self.router.db_for_write(Session), 'sessions')
+        self.assertTrue(self.router.allow_migrate('sessions', 'sessions'))
+        self.assertFalse(self.router.allow_migrate('default', 'sessions'))
+
+    def test_other_apps_not_migrated_to_mapped_database(self):
+        """Таблицы постов не создаются в базе сессий."""
+        self.assertIsNone(self.router.db_for_write(Post))
+        self.assertFalse(self.router.allow_migrate('sessions', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        pin_to_primary(False)
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        """Посты читаются из реплики, пользователи из основной базы."""
+        pin_to_primary(False)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertIsNone(self.router.db_for_write(Post))
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+    def test_reads_after_write_go_to_primary(self):
+        """После записи поток читает из основной базы."""
+        pin_to_primary(False)
+        self.router.db_for_write(Comment)
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_sticky_cookie_after_write(self):
+        """После записи ставится cookie, закрепляющая основную базу."""
+        def view(request):
+            self.router.db_for_write(Comment)
+            return HttpResponse()
+
+        response = ReplicaStickyMiddleware(view)(self.factory.post('/'))
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+        def read_view(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = cookie.value
+        response = ReplicaStickyMiddleware(read_view)(request)
+        self.assertEqual(response.content, b'None')
+        response = ReplicaStickyMiddleware(read_view)(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+
+
+@override_settings(DATABASE_SHARDS=['shard_0', 'shard_1', 'shard_2'])
+class ShardRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ShardRouter()
+        self.post = Post(pk=4)
+        self.user = User(pk=5)
+
+    def test_shard_for_is_deterministic(self):
+        """Ключ всегда попадает в один и тот же шард."""
+        self.assertEqual(shard_for(4), 'shard_1')
+        self.assertEqual(shard_for('5'), 'shard_2')
+        with self.settings(DATABASE_SHARDS=[]):
+            self.assertEqual(shard_for(4), 'default')
+
+    def test_rows_routed_by_shard_key(self):
+        """Комментарии лежат в шарде поста, подписки в шарде читателя."""
+        comment = Comment(post_id=4)
+        follow = Follow(user_id=5, author_id=1)
+        self.assertEqual(
+            self.router.db_for_write(Comment, instance=comment), 'shard_1'
+        )
+        self.assertEqual(
+            self.router.db_for_write(Follow, instance=follow), 'shard_2'
+        )
+
+    def test_related_manager_reads_own_shard(self):
+        """post.comments и user.follower читают из шарда владельца."""
+        self.assertEqual(
+            self.router.db_for_read(Comment, instance=self.post), 'shard_1'
+        )
+        self.assertEqual(
+            self.router.db_for_read(Follow, instance=self.user), 'shard_2'
+        )
+        self.assertIsNone(self.router.db_for_read(Comment))
+
+    def test_relations_from_shard_lead_to_default(self):
+        """Автор комментария из шарда читается из основной базы."""
+        comment = Comment(post_id=4)
+        comment._state.db = 'shard_1'
+        self.assertEqual(
+            self.router.db_for_read(User, instance=comment), 'default'
+        )
+        self.assertIsNone(self.router.db_for_read(User, instance=self.post))
+
+    def test_only_sharded_models_migrated_to_shards(self):
+        """В шардах создаются только таблицы шардированных моделей."""
+        allow_migrate = self.router.allow_migrate
+        self.assertTrue(allow_migrate('shard_0', 'posts', 'comment'))
+        self.assertFalse(allow_migrate('shard_0', 'posts', 'post'))
+        self.assertIsNone(allow_migrate('default', 'posts', 'post'))
@@ -1,4 +1,14 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.decorators import user_passes_test
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect, render
+
+from .forms import ProfilerSwitchForm
+from .memory import format_report, memory_report, start_tracing, stop_tracing
+from .profiler import get_sample_rate, make_profile_token, set_sample_rate
+from .prometheus import (CONTENT_TYPE, merge_exports, read_exports,
+                         render_metrics)
 
 
 def page_not_found(request, exception):
@@ -15,3 +25,57 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики всех процессов в формате Prometheus."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    views, histograms = merge_exports(read_exports())
+    return HttpResponse(
+        render_metrics(views, histograms), content_type=CONTENT_TYPE
+    )
+
+
+superuser_required = user_passes_test(
+    lambda user: user.is_superuser, login_url='admin:login'
+)
+
+
+@superuser_required
+def profiler_switch(request):
+    """Включение профилирования для администраторов."""
+    form = ProfilerSwitchForm(
+        request.POST or None, initial={'sample_rate': get_sample_rate()}
+    )
+    if form.is_valid():
+        set_sample_rate(form.cleaned_data['sample_rate'])
+        return redirect('profiler_switch')
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Профилирование',
+        'form': form,
+        'token': make_profile_token(),
+        'token_max_age': settings.PROFILER_TOKEN_MAX_AGE,
+        'profiler_dir': settings.PROFILER_DIR,
+    }
+    return render(request, 'admin/profiler.html', context)
+
+
+@superuser_required
+def memory_diagnostics(request):
+    """Отчёт о памяти процесса, который обслужил запрос."""
+    if request.method == 'POST':
+        if request.POST.get('action') == 'start':
+            start_tracing()
+        elif request.POST.get('action') == 'stop':
+            stop_tracing()
+        return redirect('memory_diagnostics')
+    report = memory_report(settings.MEMORY_REPORT_LIMIT)
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Память',
+        'tracing': report['tracing'],
+        'report': format_report(report),
+    }
+    return render(request, 'admin/memory.html', context)
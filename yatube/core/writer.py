@@ -0,0 +1,87 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .routers import mark_primary_write
+
+
+class WriteQueue:
+    """
+    Единственный поток-писатель процесса. Забирает накопившиеся
+    записи пачкой и выполняет их в одной транзакции, каждую в своей
+    точке сохранения: ошибка одной записи не откатывает остальные.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.tasks = queue.Queue()
+        self.thread = threading.Thread(
+            target=self.run, name='write-queue', daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self.tasks.put((future, func, args, kwargs))
+        return future
+
+    def run(self):
+        while True:
+            batch = [self.tasks.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.tasks.get_nowait())
+                except queue.Empty:
+                    break
+            close_old_connections()
+            self.commit(batch)
+
+    def commit(self, batch):
+        results = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            result = func(*args, **kwargs)
+                    except Exception as error:
+                        results.append((future, None, error))
+                    else:
+                        results.append((future, result, None))
+        except Exception as error:
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(settings.WRITE_QUEUE_BATCH_SIZE)
+    return _write_queue
+
+
+def run_write(func, *args, **kwargs):
+    """
+    Выполняет запись через очередь писателя, если WRITE_QUEUE_ENABLED,
+    иначе вызывает func сразу. Возвращает результат func.
+    """
+    if not settings.WRITE_QUEUE_ENABLED:
+        return func(*args, **kwargs)
+    future = get_write_queue().submit(func, *args, **kwargs)
+    # Запись выполнил другой поток, закрепляем за основной базой этот
+    mark_primary_write()
+    return future.result(settings.WRITE_QUEUE_TIMEOUT)
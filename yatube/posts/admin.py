@@ -1,7 +1,44 @@
+from django.conf import settings
 from django.contrib import admin
+from django.template.response import TemplateResponse
 
+from core.sharding import scatter_gather
 from posts.models import Comment, Follow, Group, Post
 
+SHARD_PARAM = 'shard'
+
+
+class ShardedModelAdmin(admin.ModelAdmin):
+    """
+    Админка модели из DATABASE_SHARDED_MODELS. Список собирается со всех
+    шардов, объект открывается в шарде из параметра ?shard=.
+    """
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        shard = request.GET.get(SHARD_PARAM)
+        if shard in settings.DATABASE_SHARDS:
+            return queryset.using(shard)
+        return queryset
+
+    def changelist_view(self, request, extra_context=None):
+        if not settings.DATABASE_SHARDS:
+            return super().changelist_view(request, extra_context)
+        objects = scatter_gather(
+            self.get_queryset(request), self.list_per_page
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': self.model._meta.verbose_name_plural,
+            'objects': [(obj, obj._state.db) for obj in objects],
+            'shard_param': SHARD_PARAM,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(
+            request, 'admin/sharded_change_list.html', context
+        )
+
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
@@ -11,7 +48,11 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class FollowAdmin(ShardedModelAdmin):
+    ordering = ('-pk',)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Comment, ShardedModelAdmin)
+admin.site.register(Follow, FollowAdmin)
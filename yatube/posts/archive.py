@@ -0,0 +1,166 @@
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+
+from core.db import cached_count
+
+from .models import ArchivedComment, ArchivedPost, Post
+
+ARCHIVE_VERSION_KEY = 'archive:version'
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Больше не влезает в 64-битный INTEGER
+MAX_PK = 2 ** 63 - 1
+
+
+def bump_archive_version():
+    """Сбрасывает закэшированные размеры архива после переноса записей."""
+    version = time.time_ns()
+    cache.set(ARCHIVE_VERSION_KEY, version, None)
+    return version
+
+
+def archive_count(queryset):
+    """
+    Число архивных записей в queryset. Архив меняется только командой
+    archive_posts, поэтому счётчик кэшируется до следующего переноса.
+    """
+    version = cache.get(ARCHIVE_VERSION_KEY) or bump_archive_version()
+    query = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f'archive:count:{version}:{query}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, None)
+    return count
+
+
+class ArchiveFallthrough:
+    """
+    Горячие записи, за ними архивные, для Paginator и шаблонов.
+    Архив старше любой горячей записи, поэтому порядок сохраняется,
+    а архивная таблица читается, только когда срез выходит за
+    горячие записи.
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+
+    @cached_property
+    def hot_count(self):
+        return self.hot.count()
+
+    def count(self):
+        return cached_count(self.hot) + archive_count(self.archived)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            items = self[key:key + 1]
+            if not items:
+                raise IndexError(key)
+            return items[0]
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        items = list(self.hot[start:stop])
+        if len(items) < stop - start:
+            # Горячие записи кончились внутри среза, их число известно
+            # без COUNT, если в срез попала хоть одна
+            hot_count = start + len(items) if items else self.hot_count
+            items += self.archived[
+                max(start - hot_count, 0):stop - hot_count
+            ]
+        return items
+
+    def __iter__(self):
+        yield from self.hot
+        yield from self.archived
+
+
+def get_post_or_archived(post_id):
+    """Пост по id из горячей таблицы или, если его там нет, из архива."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        post = get_object_or_404(ArchivedPost, pk=post_id)
+    return post
+
+
+def with_archived_posts(posts, **filters):
+    """Посты из posts и архивные посты с теми же фильтрами."""
+    archived = ArchivedPost.objects.select_related('author', 'group')
+    return ArchiveFallthrough(posts, archived.filter(**filters))
+
+
+def make_cursor(item):
+    """Курсор после item: таблица, время в микросекундах и id."""
+    source = 'a' if item.is_archived else 'h'
+    micros = (item.pub_date - EPOCH) // timedelta(microseconds=1)
+    return f'{source}.{micros}.{item.pk}'
+
+
+def parse_cursor(cursor):
+    """
+    Таблица, время и id из курсора make_cursor или None, если курсор
+    испорчен: время вне диапазона дат или id шире 64 бит.
+    """
+    try:
+        source, micros, pk = cursor.split('.')
+        pub_date = EPOCH + timedelta(microseconds=int(micros))
+        pk = int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+    if not 0 < pk <= MAX_PK:
+        return None
+    return source, pub_date, pk
+
+
+def cursor_sources(items):
+    """Горячая и архивная части ленты для cursor_batch."""
+    if isinstance(items, ArchiveFallthrough):
+        return [('h', items.hot), ('a', items.archived)]
+    return [('h', items)]
+
+
+def cursor_batch(sources, cursor, limit):
+    """
+    Пачка записей после cursor и курсор следующей пачки или None.
+    Источники идут по очереди: горячая таблица, затем более старый
+    архив. Внутри таблицы порядок по (pub_date, id), поэтому пачка
+    читается по индексу без OFFSET. Неверный курсор — первая пачка.
+    """
+    position = parse_cursor(cursor)
+    if position is not None:
+        names = [name for name, _ in sources]
+        if position[0] in names:
+            sources = sources[names.index(position[0]):]
+
+    items = []
+    for name, queryset in sources:
+        queryset = queryset.order_by('-pub_date', '-pk')
+        if position is not None and position[0] == name:
+            _, pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        # Лишняя запись показывает, есть ли следующая пачка
+        items += queryset[:limit + 1 - len(items)]
+        if len(items) > limit:
+            return items[:limit], make_cursor(items[limit - 1])
+    return items, None
+
+
+def post_comments(post, cursor=None):
+    """Пачка комментариев поста после cursor, затем архивных."""
+    archived = ArchivedComment.objects.select_related('author').filter(
+        post_id=post.pk
+    )
+    sources = [('a', archived)]
+    if not post.is_archived:
+        # Комментарии могут лежать в шарде, авторы всегда в основной базе
+        sources.insert(0, ('h', post.comments.prefetch_related('author')))
+    return cursor_batch(sources, cursor, settings.LIMIT_COMMENTS)
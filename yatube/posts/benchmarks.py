@@ -0,0 +1,188 @@
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from core.db import wrap_all_queries
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SCALES = {
+    'tiny': {'users': 5, 'groups': 2, 'posts': 20, 'comments': 20,
+             'follows': 2},
+    'small': {'users': 50, 'groups': 5, 'posts': 500, 'comments': 1000,
+              'follows': 10},
+    'medium': {'users': 500, 'groups': 20, 'posts': 10_000,
+               'comments': 30_000, 'follows': 30},
+    'large': {'users': 5000, 'groups': 100, 'posts': 100_000,
+              'comments': 300_000, 'follows': 100},
+}
+
+
+def seed(users, groups, posts, comments, follows, random_seed=0):
+    """Заполняет базу данными заданного масштаба для замеров."""
+    rng = random.Random(random_seed)
+    User.objects.bulk_create(
+        User(username=f'bench{i}') for i in range(users)
+    )
+    Group.objects.bulk_create(
+        Group(title=f'Группа {i}', slug=f'bench{i}', description='')
+        for i in range(groups)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    Post.objects.bulk_create(
+        Post(
+            text=f'Пост {i}',
+            author_id=rng.choice(user_ids),
+            group_id=rng.choice(group_ids) if rng.random() < 0.5 else None,
+        )
+        for i in range(posts)
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        Comment(
+            text=f'Комментарий {i}',
+            post_id=rng.choice(post_ids),
+            author_id=rng.choice(user_ids),
+        )
+        for i in range(comments)
+    )
+    Follow.objects.bulk_create(
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in rng.sample(user_ids, min(follows + 1, len(user_ids)))
+        if author_id != user_id
+    )
+    return {
+        'usernames': list(User.objects.values_list('username', flat=True)),
+        'slugs': list(Group.objects.values_list('slug', flat=True)),
+        'post_ids': post_ids,
+        'pages': max(1, posts // settings.LIMIT_POST),
+    }
+
+
+def page(data, i):
+    return f'?page={i % data["pages"] + 1}'
+
+
+def pick(items, i):
+    return items[i * 7919 % len(items)]
+
+
+# Сценарий: имя и функция (данные, номер итерации) -> метод, путь, тело
+SCENARIOS = (
+    ('index', lambda data, i: (
+        'get', reverse('posts:index') + page(data, i), None)),
+    ('group_posts', lambda data, i: ('get', reverse(
+        'posts:group_list', args=[pick(data['slugs'], i)]), None)),
+    ('profile', lambda data, i: ('get', reverse(
+        'posts:profile', args=[pick(data['usernames'], i)]), None)),
+    ('post_detail', lambda data, i: ('get', reverse(
+        'posts:post_detail', args=[pick(data['post_ids'], i)]), None)),
+    ('follow_index', lambda data, i: (
+        'get', reverse('posts:follow_index'), None)),
+    ('post_create', lambda data, i: (
+        'post', reverse('posts:post_create'), {'text': f'Новый пост {i}'})),
+    ('add_comment', lambda data, i: ('post', reverse(
+        'posts:add_comment', args=[pick(data['post_ids'], i)]),
+        {'text': f'Новый комментарий {i}'})),
+    ('profile_follow', lambda data, i: ('get', reverse(
+        'posts:profile_follow', args=[pick(data['usernames'], i)]), None)),
+    ('profile_unfollow', lambda data, i: ('get', reverse(
+        'posts:profile_unfollow', args=[pick(data['usernames'], i)]), None)),
+)
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[round(percent / 100 * (len(ordered) - 1))]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def request(client, build, data, i):
+    method, path, payload = build(data, i)
+    response = getattr(client, method)(path, payload)
+    # Отписка от автора, на которого не подписан, отвечает 404
+    if response.status_code >= 500:
+        raise RuntimeError(f'{path}: {response.status_code}')
+
+
+def run_scenario(client, build, data, iterations, allocation_iterations):
+    """
+    Замеры сценария: перцентили времени ответа, пропускная
+    способность, запросы к БД и пик выделенной памяти на запрос.
+    Память меряется отдельным проходом: tracemalloc замедляет ответы.
+    """
+    latencies = []
+    counter = QueryCounter()
+    with wrap_all_queries(counter):
+        started = time.perf_counter()
+        for i in range(iterations):
+            start = time.perf_counter()
+            request(client, build, data, i)
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+
+    allocations = []
+    tracemalloc.start()
+    try:
+        for i in range(iterations, iterations + allocation_iterations):
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                # До Python 3.9: сброс трасс обнуляет и пик
+                tracemalloc.clear_traces()
+            before, _ = tracemalloc.get_traced_memory()
+            request(client, build, data, i)
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'rps': iterations / elapsed,
+        'queries': counter.queries / iterations,
+        'alloc_kib': (
+            percentile(allocations, 50) / 1024 if allocations else 0
+        ),
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Сценарии, где p95 вырос больше чем на tolerance или стало
+    больше запросов к БД, чем в базовой версии.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {result["p95_ms"]:.1f} мс, '
+                f'было {base["p95_ms"]:.1f} мс'
+            )
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов к БД {result["queries"]:.1f}, '
+                f'было {base["queries"]:.1f}'
+            )
+    return regressions
@@ -0,0 +1,77 @@
+import hashlib
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def follow_key(user_id):
+    return f'follows:{user_id}'
+
+
+def contains(authors, author_id):
+    index = bisect_left(authors, author_id)
+    return index < len(authors) and authors[index] == author_id
+
+
+def followed_authors(user):
+    """
+    Отсортированный массив id авторов, на которых подписан user.
+    Держится в кэше и сбрасывается сигналами подписки, в базу идёт
+    только при промахе. Подписки читаются через user.follower, поэтому из
+    шарда пользователя.
+    """
+    key = follow_key(user.pk)
+    authors = cache.get(key)
+    if authors is None:
+        authors = array('q', sorted(
+            user.follower.values_list('author_id', flat=True)
+        ))
+        cache.set(key, authors, settings.FOLLOW_GRAPH_TIMEOUT)
+    return authors
+
+
+def feed_authors(user):
+    """
+    Авторы для фильтра ленты подписок. Без шардов — подзапрос к
+    подпискам: длинный список id упёрся бы в лимит параметров SQLite,
+    и у каждого списка был бы свой ключ cached_count. В другую базу
+    подзапрос невозможен, поэтому с шардами берётся массив из кэша.
+    """
+    if settings.DATABASE_SHARDS:
+        return list(followed_authors(user))
+    return user.follower.values('author')
+
+
+def follows_digest(user):
+    """Отпечаток набора подписок user для ключей кэша."""
+    return hashlib.md5(followed_authors(user).tobytes()).hexdigest()
+
+
+def is_following(user, author_id):
+    """Подписан ли user на автора author_id."""
+    return (
+        user.is_authenticated
+        and contains(followed_authors(user), int(author_id))
+    )
+
+
+def following_map(user, author_ids):
+    """Подписан ли user на каждого из авторов author_ids, одним чтением."""
+    if not user.is_authenticated:
+        return {author_id: False for author_id in author_ids}
+    authors = followed_authors(user)
+    return {
+        author_id: contains(authors, int(author_id))
+        for author_id in author_ids
+    }
+
+
+def forget_follows(user_id):
+    """
+    Сбрасывает закэшированный массив после подписки или отписки,
+    следующее чтение соберёт его заново. Правка массива на месте
+    теряла бы одно из двух одновременных изменений.
+    """
+    cache.delete(follow_key(user_id))
@@ -0,0 +1,36 @@
+from core.page_holes import register_hole
+
+from .follow_graph import is_following
+from .forms import CommentForm
+
+
+@register_hole('switcher', 'posts/includes/switcher.html')
+def switcher(request, view_name):
+    return {'view_name': view_name}
+
+
+@register_hole('follow_button', 'posts/includes/follow_button.html')
+def follow_button(request, author, author_id):
+    user = request.user
+    following = (user.username != author
+                 and is_following(user, author_id))
+    return {
+        'author': author,
+        'following': following,
+    }
+
+
+@register_hole('post_edit_button', 'posts/includes/post_edit_button.html')
+def post_edit_button(request, post_id, author):
+    return {
+        'post_id': post_id,
+        'is_author': request.user.username == author,
+    }
+
+
+@register_hole('comment_form', 'posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {
+        'post_id': post_id,
+        'form': CommentForm(),
+    }
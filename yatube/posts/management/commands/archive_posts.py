@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from core.page_cache import bump_content_version
+from posts.archive import bump_archive_version
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image')
+COMMENT_FIELDS = ('post_id', 'author_id', 'text', 'pub_date')
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты и комментарии старше --days дней в архивные '
+        'таблицы пачками по --batch-size. Прерванный перенос можно '
+        'запустить повторно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+        posts = comments = 0
+        while True:
+            post_ids = list(
+                Post.objects.filter(pub_date__lt=cutoff)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not post_ids:
+                break
+            # Сначала комментарии: удаление поста удалило бы их каскадом
+            comments += self.archive_comments(
+                batch_size, post_id__in=post_ids
+            )
+            posts += self.archive_posts(post_ids)
+        comments += self.archive_comments(batch_size, pub_date__lt=cutoff)
+
+        bump_archive_version()
+        bump_content_version()
+        self.stdout.write(
+            f'В архив перенесено постов: {posts}, комментариев: {comments}'
+        )
+
+    def archive_posts(self, post_ids):
+        with transaction.atomic():
+            rows = Post.objects.filter(pk__in=post_ids).values(*POST_FIELDS)
+            ArchivedPost.objects.bulk_create(
+                ArchivedPost(**row) for row in rows
+            )
+            Post.objects.filter(pk__in=post_ids).delete()
+        return len(post_ids)
+
+    def archive_comments(self, batch_size, **filters):
+        moved = 0
+        # Комментарии могут лежать в шардах, архив в основной базе
+        for db in settings.DATABASE_SHARDS or [DEFAULT_DB_ALIAS]:
+            comments = Comment.objects.using(db).filter(**filters)
+            while True:
+                with transaction.atomic(), transaction.atomic(using=db):
+                    batch = list(
+                        comments.values('pk', *COMMENT_FIELDS)[:batch_size]
+                    )
+                    if not batch:
+                        break
+                    ArchivedComment.objects.bulk_create(
+                        ArchivedComment(**{
+                            field: row[field] for field in COMMENT_FIELDS
+                        })
+                        for row in batch
+                    )
+                    comments.filter(
+                        pk__in=[row['pk'] for row in batch]
+                    ).delete()
+                moved += len(batch)
+        return moved
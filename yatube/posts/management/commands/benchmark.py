@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.runner import DiscoverRunner
+
+from posts.benchmarks import (SCALES, SCENARIOS, find_regressions,
+                              run_scenario, seed)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет основные страницы и действия на временной базе '
+        'масштаба --scale и сравнивает с сохранённой базовой версией'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--allocation-iterations', type=int, default=5)
+        parser.add_argument(
+            '--scenario', action='append',
+            choices=[name for name, _ in SCENARIOS],
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить результаты как базовую версию',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базовой версии',
+        )
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help='Замерять на уже настроенной базе без временной, она '
+                 'заполняется данными замеров. Для тестов команды',
+        )
+
+    def handle(self, *args, **options):
+        if options['current_db']:
+            results = self.run_benchmarks(options)
+        else:
+            results = self.run_on_temp_db(options)
+        self.report(results)
+        self.compare(results, options)
+
+    def run_on_temp_db(self, options):
+        with tempfile.TemporaryDirectory() as directory:
+            connection = connections['default']
+            if connection.vendor == 'sqlite':
+                # Файл, а не база в памяти: замеры с настройками SQLite
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    directory, 'benchmark.sqlite3'
+                )
+            runner = DiscoverRunner(verbosity=0, interactive=False)
+            runner.setup_test_environment()
+            old_config = runner.setup_databases()
+            try:
+                return self.run_benchmarks(options)
+            finally:
+                runner.teardown_databases(old_config)
+                runner.teardown_test_environment()
+
+    def run_benchmarks(self, options):
+        data = seed(**SCALES[options['scale']], random_seed=options['seed'])
+        client = Client()
+        client.force_login(User.objects.get(username=data['usernames'][0]))
+        results = {}
+        for name, build in SCENARIOS:
+            if options['scenario'] and name not in options['scenario']:
+                continue
+            cache.clear()
+            results[name] = run_scenario(
+                client, build, data,
+                options['iterations'], options['allocation_iterations'],
+            )
+        return results
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"сценарий":<18}{"p50 мс":>9}{"p95 мс":>9}{"p99 мс":>9}'
+            f'{"запр/с":>9}{"SQL":>7}{"КиБ":>9}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<18}{result["p50_ms"]:>9.1f}{result["p95_ms"]:>9.1f}'
+                f'{result["p99_ms"]:>9.1f}{result["rps"]:>9.0f}'
+                f'{result["queries"]:>7.1f}{result["alloc_kib"]:>9.0f}'
+            )
+
+    def compare(self, results, options):
+        path, scale = options['baseline'], options['scale']
+        baselines = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                baselines = json.load(file)
+        if options['save_baseline']:
+            baselines[scale] = {**baselines.get(scale, {}), **results}
+            with open(path, 'w') as file:
+                json.dump(baselines, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Базовая версия сохранена в {path}')
+            return
+        if scale not in baselines:
+            self.stdout.write(f'Нет базовой версии для {scale} в {path}')
+            return
+        regressions = find_regressions(
+            results, baselines[scale], options['tolerance']
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессия производительности:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write('Регрессий нет')
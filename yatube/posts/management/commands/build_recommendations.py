@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.page_cache import bump_content_version
+from posts.recommendations import refresh_recommendations, sparse
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает похожих по подписчикам авторов для блока «Кого '
+        'почитать». По умолчанию только для авторов, чьи подписчики '
+        'изменились с прошлого запуска, и их соседей по подписчикам; '
+        '--full пересчитывает всех.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=settings.RECOMMENDATIONS_TOP_K
+        )
+        parser.add_argument('--full', action='store_true')
+
+    def handle(self, *args, **options):
+        if sparse is None:
+            self.stderr.write(
+                'NumPy и SciPy не установлены, считаем на чистом Python'
+            )
+        refreshed = refresh_recommendations(
+            options['top_k'], full=options['full']
+        )
+        bump_content_version()
+        self.stdout.write(f'Пересчитано авторов: {refreshed}')
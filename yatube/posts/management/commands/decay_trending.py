@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import decay_scores, rebuild_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Затухание оценок ленты «Обсуждаемое», запускается по расписанию. '
+        'С --rebuild оценки пересчитываются по недавним комментариям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            posts = rebuild_scores()
+            self.stdout.write(f'Пересчитаны оценки постов: {posts}')
+            return
+        factor = decay_scores()
+        self.stdout.write(f'Оценки умножены на {factor:.4f}')
@@ -0,0 +1,278 @@
+import itertools
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from core.page_cache import bump_content_version
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'seed_'
+SLUG_PREFIX = 'seed-'
+IMAGE_NAME = 'posts/seed.png'
+
+
+@contextmanager
+def explicit_pub_dates(*models):
+    """Даёт задать pub_date при вставке вместо auto_now_add."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def zipf_cum_weights(size, alpha):
+    """Накопленные веса закона Ципфа: вес ранга r — 1 / r ** alpha."""
+    return list(itertools.accumulate(
+        1 / rank ** alpha for rank in range(1, size + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями, группами, постами, комментариями '
+        'и подписками со степенным распределением. Вставляет пачками по '
+        '--chunk-size; прерванное заполнение продолжается с того же места '
+        'и даёт те же данные при том же --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--groups', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=5_000_000)
+        parser.add_argument('--comments', type=int, default=10_000_000)
+        parser.add_argument(
+            '--follows-mean', type=float, default=20,
+            help='Среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--posts-distribution', choices=('zipf', 'uniform'),
+            default='zipf', help='Распределение постов по авторам',
+        )
+        parser.add_argument('--zipf-alpha', type=float, default=1.1)
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.1,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument('--days', type=int, default=730)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+        parser.add_argument(
+            '--password', default=None,
+            help='Пароль всех созданных пользователей; без него войти '
+                 'под ними нельзя',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.now = timezone.now()
+        self.faker = Faker('ru_RU')
+        self.mixer = Mixer(commit=False)
+
+        self.seed_users()
+        self.seed_groups()
+        self.user_ids = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        self.group_ids = list(
+            Group.objects.filter(slug__startswith=SLUG_PREFIX)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        # Популярность авторов: ранги Ципфа в случайном порядке
+        self.ranked_user_ids = random.Random(options['seed']).sample(
+            self.user_ids, len(self.user_ids)
+        )
+        self.popularity = zipf_cum_weights(
+            len(self.ranked_user_ids), options['zipf_alpha']
+        )
+        with explicit_pub_dates(Post, Comment):
+            self.seed_posts()
+            self.seed_comments()
+        self.seed_follows()
+        # bulk_create не шлёт сигналов, сбрасываем кэш страниц вручную
+        bump_content_version()
+
+    def chunks(self, name, total, done):
+        """
+        Номера и размеры оставшихся пачек и генератор случайных чисел,
+        зависящий только от --seed и номера пачки.
+        """
+        size = self.options['chunk_size']
+        if done >= total:
+            return
+        for index in range(done // size, (total + size - 1) // size):
+            rng = random.Random(f'{self.options["seed"]}:{name}:{index}')
+            self.faker.seed_instance(rng.random())
+            start = index * size
+            yield start, min(size, total - start), rng
+            self.stdout.write(f'{name}: {min(start + size, total)}/{total}')
+
+    def pub_date(self, rng):
+        return self.now - timedelta(days=rng.random() * self.options['days'])
+
+    def seed_users(self):
+        total = self.options['users']
+        done = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        # Один хеш на всех: PBKDF2 для миллиона паролей занял бы часы.
+        # Без --password хеш непригодный, известного пароля у
+        # миллиона активных учёток нет
+        password = make_password(self.options['password'])
+        for start, size, rng in self.chunks('users', total, done.count()):
+            self.mixer.faker.seed_instance(rng.random())
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    self.mixer.blend(
+                        User,
+                        username=f'{USERNAME_PREFIX}{start + i}',
+                        password=password,
+                        is_staff=False,
+                        is_superuser=False,
+                        is_active=True,
+                        last_login=None,
+                    )
+                    for i in range(size)
+                )
+
+    def seed_groups(self):
+        total = self.options['groups']
+        done = Group.objects.filter(slug__startswith=SLUG_PREFIX)
+        for start, size, rng in self.chunks('groups', total, done.count()):
+            self.mixer.faker.seed_instance(rng.random())
+            with transaction.atomic():
+                Group.objects.bulk_create(
+                    self.mixer.blend(
+                        Group,
+                        title=self.faker.catch_phrase()[:200],
+                        slug=f'{SLUG_PREFIX}{start + i}',
+                    )
+                    for i in range(size)
+                )
+
+    def pick_authors(self, rng, size):
+        if self.options['posts_distribution'] == 'uniform':
+            return [rng.choice(self.user_ids) for _ in range(size)]
+        return rng.choices(
+            self.ranked_user_ids, cum_weights=self.popularity, k=size
+        )
+
+    def seed_posts(self):
+        if self.options['image_ratio']:
+            self.ensure_image()
+        total = self.options['posts']
+        done = Post.objects.filter(
+            author__username__startswith=USERNAME_PREFIX
+        )
+        for _, size, rng in self.chunks('posts', total, done.count()):
+            authors = self.pick_authors(rng, size)
+            with transaction.atomic():
+                Post.objects.bulk_create(
+                    Post(
+                        text=self.faker.paragraph(),
+                        author_id=author_id,
+                        group_id=(
+                            rng.choice(self.group_ids)
+                            if self.group_ids and rng.random() < 0.5
+                            else None
+                        ),
+                        image=(
+                            IMAGE_NAME
+                            if rng.random() < self.options['image_ratio']
+                            else ''
+                        ),
+                        pub_date=self.pub_date(rng),
+                    )
+                    for author_id in authors
+                )
+
+    def comment_date(self, rng, post_date):
+        """Время комментария между публикацией поста и текущим."""
+        return post_date + (self.now - post_date) * rng.random()
+
+    def seed_comments(self):
+        posts = list(
+            Post.objects.filter(author__username__startswith=USERNAME_PREFIX)
+            .order_by('pk').values_list('pk', 'pub_date')
+        )
+        if not posts:
+            return
+        total = self.options['comments']
+        done = Comment.objects.filter(
+            author__username__startswith=USERNAME_PREFIX
+        )
+        for _, size, rng in self.chunks('comments', total, done.count()):
+            picked = [rng.choice(posts) for _ in range(size)]
+            with transaction.atomic():
+                Comment.objects.bulk_create(
+                    Comment(
+                        text=self.faker.sentence(),
+                        post_id=post_id,
+                        author_id=rng.choice(self.user_ids),
+                        pub_date=self.comment_date(rng, post_date),
+                    )
+                    for post_id, post_date in picked
+                )
+
+    def follows_of(self, user_id, rng):
+        """
+        Подписки пользователя: их число распределено по Парето со
+        средним --follows-mean, авторы выбираются по популярности.
+        """
+        shape = 2
+        scale = self.options['follows_mean'] * (shape - 1) / shape
+        count = min(
+            int(scale * rng.paretovariate(shape)), len(self.user_ids) - 1
+        )
+        authors = set()
+        for _ in range(count * 2):
+            if len(authors) >= count:
+                break
+            author_id = rng.choices(
+                self.ranked_user_ids, cum_weights=self.popularity
+            )[0]
+            if author_id != user_id:
+                authors.add(author_id)
+        return authors
+
+    def seed_follows(self):
+        last_follower = (
+            Follow.objects.filter(user__username__startswith=USERNAME_PREFIX)
+            .order_by('-user_id').values_list('user_id', flat=True).first()
+        )
+        # Подписки пачки пишутся целиком, продолжаем со следующей пачки
+        size = self.options['chunk_size']
+        done = (
+            0 if last_follower is None
+            else (self.user_ids.index(last_follower) // size + 1) * size
+        )
+        total = len(self.user_ids)
+        for start, size, rng in self.chunks('follows', total, done):
+            with transaction.atomic():
+                Follow.objects.bulk_create(
+                    Follow(user_id=user_id, author_id=author_id)
+                    for user_id in self.user_ids[start:start + size]
+                    for author_id in self.follows_of(user_id, rng)
+                )
+
+    def ensure_image(self):
+        """Одна картинка на все посты с картинками."""
+        path = os.path.join(settings.MEDIA_ROOT, IMAGE_NAME)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            Image.new('RGB', (960, 339), (120, 140, 160)).save(path)
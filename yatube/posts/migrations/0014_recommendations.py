@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-19 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0013_feed_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowersDigest',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('followers', models.IntegerField(verbose_name='Подписчиков')),
+                ('checksum', models.BigIntegerField(verbose_name='Контрольная сумма подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Сводка подписчиков',
+                'verbose_name_plural': 'Сводки подписчиков',
+            },
+        ),
+        migrations.CreateModel(
+            name='AuthorSimilarity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_authors', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Похожий автор')),
+            ],
+            options={
+                'verbose_name': 'Похожий автор',
+                'verbose_name_plural': 'Похожие авторы',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='authorsimilarity',
+            index=models.Index(fields=['author', '-score'], name='similarity_author_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='authorsimilarity',
+            constraint=models.UniqueConstraint(fields=('author', 'similar'), name='posts_authorsimilarity_unique_pairs'),
+        ),
+    ]
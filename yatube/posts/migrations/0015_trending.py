@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-19 03:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('score', models.FloatField(db_index=True, verbose_name='Оценка')),
+                ('decayed_at', models.DateTimeField(db_index=True, null=True, verbose_name='Время последнего затухания')),
+            ],
+            options={
+                'verbose_name': 'Обсуждаемый пост',
+                'verbose_name_plural': 'Обсуждаемые посты',
+                'ordering': ['-score'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingClock',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decayed_at', models.DateTimeField(verbose_name='Время последнего затухания')),
+            ],
+            options={
+                'verbose_name': 'Затухание оценок',
+                'verbose_name_plural': 'Затухание оценок',
+            },
+        ),
+        migrations.RemoveField(
+            model_name='trendingpost',
+            name='decayed_at',
+        ),
+    ]
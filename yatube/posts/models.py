@@ -43,8 +43,22 @@ class Post(CreatedModels):
         help_text='Загрузите картинку'
     )
 
+    is_archived = False
+
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        # Ленты читаются пачками по курсору (pub_date, id)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -70,8 +84,16 @@ class Comment(CreatedModels):
         help_text='Введите текст комментария'
     )
 
+    is_archived = False
+
     class Meta:
         ordering = ['-pub_date']
+        # Пачки комментариев поста читаются по курсору (pub_date, id)
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date'], name='comment_post_date_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -108,3 +130,172 @@ class Follow(models.Model):
             f'Пользователь {self.user}'
             f'подписывается на автора {self.author}'
         )
+
+
+class ArchivedPost(models.Model):
+    """Пост, перенесённый в архив командой archive_posts. Id сохраняется."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации', db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='Группа'
+    )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+
+    is_archived = True
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='archived_post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='archived_post_group_date_idx',
+            ),
+        ]
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self):
+        return self.text[:settings.NUM_SYMBOL__STR__]
+
+
+class ArchivedComment(models.Model):
+    """
+    Комментарий из архива. Пост может быть как архивным, так и
+    горячим, поэтому post_id хранится без внешнего ключа.
+    """
+    post_id = models.IntegerField('Id поста', db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор комментария'
+    )
+    text = models.TextField('Текст комментария')
+    pub_date = models.DateTimeField('Дата публикации')
+
+    is_archived = True
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['post_id', '-pub_date'],
+                name='archived_comment_post_date_idx',
+            ),
+        ]
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+    def __str__(self) -> str:
+        return self.text[:settings.NUM_SYMBOL__STR__]
+
+
+class AuthorSimilarity(models.Model):
+    """
+    Похожий автор: на обоих подписаны одни и те же люди. Заполняется
+    командой build_recommendations, по score лучшие идут первыми.
+    """
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='similar_authors',
+        verbose_name='Автор'
+    )
+    similar = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий автор'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(
+                fields=['author', '-score'], name='similarity_author_score_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                name='posts_authorsimilarity_unique_pairs',
+                fields=['author', 'similar'],
+            ),
+        ]
+        verbose_name = 'Похожий автор'
+        verbose_name_plural = 'Похожие авторы'
+
+    def __str__(self):
+        return f'{self.author} ~ {self.similar}: {self.score:.3f}'
+
+
+class FollowersDigest(models.Model):
+    """
+    Сводка подписчиков автора на момент расчёта похожих авторов: по
+    ней build_recommendations находит, чьи подписчики изменились.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    followers = models.IntegerField('Подписчиков')
+    checksum = models.BigIntegerField('Контрольная сумма подписчиков')
+
+    class Meta:
+        verbose_name = 'Сводка подписчиков'
+        verbose_name_plural = 'Сводки подписчиков'
+
+
+class TrendingPost(models.Model):
+    """
+    Обсуждаемость поста: каждый комментарий прибавляет единицу, команда
+    decay_trending периодически уменьшает все оценки вдвое за период
+    полураспада. Лента «Обсуждаемое» читает лучшие по индексу score.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    score = models.FloatField('Оценка', db_index=True)
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Обсуждаемый пост'
+        verbose_name_plural = 'Обсуждаемые посты'
+
+    def __str__(self):
+        return f'{self.post}: {self.score:.2f}'
+
+
+class TrendingClock(models.Model):
+    """
+    Время последнего затухания оценок, одна строка. Хранится отдельно
+    от оценок: затухание может удалить их все.
+    """
+    decayed_at = models.DateTimeField('Время последнего затухания')
+
+    class Meta:
+        verbose_name = 'Затухание оценок'
+        verbose_name_plural = 'Затухание оценок'
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
+
+from core.page_cache import get_content_version
+
+from .models import ArchivedPost, Follow, Post
+
+User = get_user_model()
+
+# Поля шапки профиля, только они попадают в кэш
+HEADER_USER_FIELDS = ('pk', 'username', 'first_name', 'last_name')
+HEADER_COUNT_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def count_of(queryset, field):
+    """Подзапрос с числом строк queryset, где field равно pk автора."""
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def load_profile_author(username):
+    """
+    Автор и числа для шапки профиля одним запросом: посты вместе с
+    архивными, подписчики и подписки. Подписки в шардах считаются
+    отдельно, подзапрос в другую базу невозможен.
+    """
+    authors = User.objects.filter(username=username).annotate(
+        hot_posts_count=count_of(Post.objects, 'author'),
+        archived_posts_count=count_of(ArchivedPost.objects, 'author'),
+    )
+    if not settings.DATABASE_SHARDS:
+        authors = authors.annotate(
+            followers_count=count_of(Follow.objects, 'author'),
+            following_count=count_of(Follow.objects, 'user'),
+        )
+    author = authors.first()
+    if author is None:
+        raise Http404('Пользователь не найден')
+    author.posts_count = author.hot_posts_count + author.archived_posts_count
+    if settings.DATABASE_SHARDS:
+        author.followers_count = sum(
+            Follow.objects.using(db).filter(author=author).count()
+            for db in settings.DATABASE_SHARDS
+        )
+        author.following_count = author.follower.count()
+    return author
+
+
+def header_author(header):
+    """
+    Автор из закэшированной шапки: несохраняемый экземпляр только с
+    публичными полями, без пароля, почты и флагов.
+    """
+    author = User(**{field: header[field] for field in HEADER_USER_FIELDS})
+    author._state.adding = False
+    author._state.db = DEFAULT_DB_ALIAS
+    for field in HEADER_COUNT_FIELDS:
+        setattr(author, field, header[field])
+    return author
+
+
+def get_profile_author(username):
+    """
+    Автор для страницы профиля. В кэше до смены версии контента лежат
+    только поля шапки. Подписан ли на него зритель, в кэш не попадает:
+    это считает персональный фрагмент follow_button.
+    """
+    key = f'profile:{get_content_version()}:{username}'
+    header = cache.get(key)
+    if header is None:
+        author = load_profile_author(username)
+        header = {
+            field: getattr(author, field)
+            for field in HEADER_USER_FIELDS + HEADER_COUNT_FIELDS
+        }
+        cache.set(key, header, settings.PAGE_CACHE_TIMEOUT)
+    return header_author(header)
@@ -0,0 +1,290 @@
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.db import batches
+
+from .follow_graph import contains, followed_authors
+from .models import AuthorSimilarity, Follow, FollowersDigest
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+User = get_user_model()
+
+# Столько авторов за раз умножается на матрицу подписок
+BLOCK_SIZE = 1000
+# Столько id за раз уходит в IN
+WRITE_BATCH = 500
+CHECKSUM_MOD = 2 ** 63
+MASK64 = 2 ** 64 - 1
+# Константы перемешивания splitmix64
+MIX_GAMMA = 0x9E3779B97F4A7C15
+MIX_FIRST = 0xBF58476D1CE4E5B9
+MIX_SECOND = 0x94D049BB133111EB
+# Строк сходства на одну рекомендацию: часть уйдёт на отслеживаемых
+OVERFETCH = 10
+
+
+def load_follows():
+    """
+    Все подписки со всех шардов: массивы id подписчиков и авторов
+    одинаковой длины. С NumPy строки шарда сразу ложатся в int64.
+    """
+    shards = settings.DATABASE_SHARDS or [DEFAULT_DB_ALIAS]
+    rows = (
+        Follow.objects.using(db).values_list('user_id', 'author_id')
+        .iterator() for db in shards
+    )
+    if numpy is None:
+        users, authors = array('q'), array('q')
+        for shard in rows:
+            for user_id, author_id in shard:
+                users.append(user_id)
+                authors.append(author_id)
+        return users, authors
+    pairs = numpy.concatenate([
+        numpy.fromiter(shard, dtype=[('user', 'i8'), ('author', 'i8')])
+        for shard in rows
+    ])
+    return pairs['user'], pairs['author']
+
+
+def mix_id(value):
+    """Перемешанный хеш id, как в splitmix64."""
+    value = (value + MIX_GAMMA) & MASK64
+    value = ((value ^ (value >> 30)) * MIX_FIRST) & MASK64
+    value = ((value ^ (value >> 27)) * MIX_SECOND) & MASK64
+    return value ^ (value >> 31)
+
+
+def mix_ids(values):
+    """mix_id для массива NumPy, переполнение uint64 и есть & MASK64."""
+    values = values.astype(numpy.uint64) + numpy.uint64(MIX_GAMMA)
+    values = (
+        (values ^ (values >> numpy.uint64(30))) * numpy.uint64(MIX_FIRST)
+    )
+    values = (
+        (values ^ (values >> numpy.uint64(27))) * numpy.uint64(MIX_SECOND)
+    )
+    return values ^ (values >> numpy.uint64(31))
+
+
+def follower_digests(users, authors):
+    """
+    Число подписчиков и контрольная сумма по каждому автору. Сумма
+    перемешанных хешей id не зависит от порядка подписок, но в отличие
+    от суммы самих id не совпадает у {1, 4} и {2, 3}.
+    """
+    if numpy is None:
+        digests = defaultdict(lambda: [0, 0])
+        for user_id, author_id in zip(users, authors):
+            digest = digests[author_id]
+            digest[0] += 1
+            digest[1] = (digest[1] + mix_id(user_id)) % CHECKSUM_MOD
+        return {author: tuple(digest) for author, digest in digests.items()}
+    if not len(authors):
+        return {}
+    users = numpy.asarray(users, dtype=numpy.int64)
+    authors = numpy.asarray(authors, dtype=numpy.int64)
+    order = numpy.argsort(authors, kind='stable')
+    authors = authors[order]
+    starts = numpy.flatnonzero(
+        numpy.concatenate(([True], authors[1:] != authors[:-1]))
+    )
+    counts = numpy.diff(numpy.append(starts, len(authors)))
+    # Сумма по модулю 2**64 обрезается до модуля 2**63
+    checksums = numpy.add.reduceat(mix_ids(users[order]), starts)
+    checksums &= numpy.uint64(CHECKSUM_MOD - 1)
+    return {
+        int(author): (int(count), int(checksum))
+        for author, count, checksum in
+        zip(authors[starts], counts, checksums)
+    }
+
+
+def co_followed(users, authors, changed):
+    """Авторы, у которых есть общий подписчик с кем-то из changed."""
+    if numpy is None:
+        fans = {
+            user_id for user_id, author_id in zip(users, authors)
+            if author_id in changed
+        }
+        return {
+            author_id for user_id, author_id in zip(users, authors)
+            if user_id in fans
+        }
+    users = numpy.asarray(users, dtype=numpy.int64)
+    authors = numpy.asarray(authors, dtype=numpy.int64)
+    fans = users[numpy.isin(authors, list(changed))]
+    return set(numpy.unique(authors[numpy.isin(users, fans)]).tolist())
+
+
+def top_similar_python(users, authors, targets, top_k):
+    """
+    Косинусное сходство авторов по общим подписчикам: число общих,
+    делённое на корни из чисел подписчиков. При равном сходстве выше
+    автор с меньшим id.
+    """
+    followers = defaultdict(list)
+    follows = defaultdict(list)
+    for user_id, author_id in zip(users, authors):
+        followers[author_id].append(user_id)
+        follows[user_id].append(author_id)
+    result = {}
+    for author in targets:
+        common = Counter()
+        for user_id in followers[author]:
+            common.update(follows[user_id])
+        del common[author]
+        scored = (
+            (other, count / (
+                math.sqrt(len(followers[author]))
+                * math.sqrt(len(followers[other]))
+            ))
+            for other, count in common.items()
+        )
+        result[author] = heapq.nsmallest(
+            top_k, scored, key=lambda item: (-item[1], item[0])
+        )
+    return result
+
+
+def top_similar_scipy(users, authors, targets, top_k):
+    """
+    То же сходство на разреженной матрице пользователь × автор:
+    общие подписчики блока авторов — одно матричное произведение.
+    """
+    users = numpy.asarray(users, dtype=numpy.int64)
+    authors = numpy.asarray(authors, dtype=numpy.int64)
+    _, user_index = numpy.unique(users, return_inverse=True)
+    author_ids, author_index = numpy.unique(authors, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (numpy.ones(len(users)), (user_index, author_index)),
+        shape=(user_index.max() + 1, len(author_ids)),
+    )
+    norms = numpy.sqrt(numpy.asarray(matrix.sum(axis=0)).ravel())
+    columns = matrix.tocsc()
+    positions = numpy.searchsorted(author_ids, targets)
+    result = {}
+    for start in range(0, len(positions), BLOCK_SIZE):
+        block = positions[start:start + BLOCK_SIZE]
+        common = (columns[:, block].T @ matrix).tocsr()
+        for row, position in enumerate(block):
+            others = common.indices[common.indptr[row]:common.indptr[row + 1]]
+            counts = common.data[common.indptr[row]:common.indptr[row + 1]]
+            keep = others != position
+            others, counts = others[keep], counts[keep]
+            scores = counts / (norms[position] * norms[others])
+            # Столбцы идут по возрастанию id: при равенстве меньший id
+            best = numpy.lexsort((others, -scores))[:top_k]
+            result[int(author_ids[position])] = [
+                (int(author_ids[others[i]]), float(scores[i])) for i in best
+            ]
+    return result
+
+
+def top_similar(users, authors, targets, top_k):
+    if not len(users) or not targets:
+        return {author: [] for author in targets}
+    if sparse is not None:
+        return top_similar_scipy(users, authors, targets, top_k)
+    return top_similar_python(users, authors, targets, top_k)
+
+
+def refresh_recommendations(top_k, full=False):
+    """
+    Пересчитывает похожих авторов для тех, чьи подписчики изменились с
+    прошлого расчёта, и для их соседей: авторов с общим подписчиком и
+    авторов, в чьих списках изменившийся уже стоит. При full
+    пересчитываются все. Возвращает число пересчитанных авторов.
+    """
+    users, authors = load_follows()
+    digests = follower_digests(users, authors)
+    if full:
+        stored = {}
+    else:
+        stored = {
+            author: (followers, checksum)
+            for author, followers, checksum in
+            FollowersDigest.objects.values_list(
+                'author_id', 'followers', 'checksum'
+            )
+        }
+    changed = {
+        author for author, digest in digests.items()
+        if stored.get(author) != digest
+    }
+    gone = set(stored) - set(digests)
+    targets = set(changed)
+    if not full:
+        if changed:
+            targets |= co_followed(users, authors, changed)
+        for batch in batches(changed | gone, WRITE_BATCH):
+            # Отписка могла разорвать единственную связь с соседом
+            targets.update(AuthorSimilarity.objects.filter(
+                similar_id__in=batch
+            ).values_list('author_id', flat=True))
+    targets = sorted(targets & set(digests))
+    similar = top_similar(users, authors, targets, top_k)
+
+    with transaction.atomic():
+        if full:
+            AuthorSimilarity.objects.all().delete()
+            FollowersDigest.objects.all().delete()
+        for batch in batches(set(targets) | gone, WRITE_BATCH):
+            AuthorSimilarity.objects.filter(author_id__in=batch).delete()
+            FollowersDigest.objects.filter(author_id__in=batch).delete()
+        AuthorSimilarity.objects.bulk_create(
+            AuthorSimilarity(author_id=author, similar_id=other, score=score)
+            for author, others in similar.items()
+            for other, score in others
+        )
+        FollowersDigest.objects.bulk_create(
+            FollowersDigest(
+                author_id=author,
+                followers=digests[author][0],
+                checksum=digests[author][1],
+            )
+            for author in targets
+        )
+    return len(targets)
+
+
+def similar_authors(author, limit):
+    """Авторы, похожие на author, по убыванию сходства."""
+    rows = AuthorSimilarity.objects.filter(author=author).select_related(
+        'similar'
+    )[:limit]
+    return [row.similar for row in rows]
+
+
+def who_to_follow(user, limit):
+    """
+    Авторы, похожие на тех, на кого подписан user, кроме уже
+    отслеживаемых и его самого. Отслеживаемые отсеиваются по массиву
+    подписок из кэша, а не в SQL.
+    """
+    followed = followed_authors(user)
+    if not followed:
+        return []
+    rows = (
+        AuthorSimilarity.objects.filter(author__in=followed[:WRITE_BATCH])
+        .select_related('similar')[:limit * OVERFETCH]
+    )
+    authors = {}
+    for row in rows:
+        if row.similar_id == user.pk or contains(followed, row.similar_id):
+            continue
+        authors.setdefault(row.similar_id, row.similar)
+        if len(authors) == limit:
+            break
+    return list(authors.values())
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.page_cache import bump_content_version
+
+from .follow_graph import forget_follows
+from .models import Comment, Follow, Group, Post
+from .trending import bump_post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=User)
+def invalidate_pages(sender, **kwargs):
+    bump_content_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_pages_on_user_change(sender, update_fields=None, **kwargs):
+    """Обновление last_login при входе на страницы не влияет."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_content_version()
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def reset_follow_graph(sender, instance, **kwargs):
+    forget_follows(instance.user_id)
+
+
+@receiver(post_save, sender=Comment)
+def bump_trending(sender, instance, created, **kwargs):
+    if created:
+        bump_post(instance.post_id)
@@ -0,0 +1,51 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from posts.benchmarks import find_regressions, percentile
+
+BASELINE = {
+    'index': {'p95_ms': 10.0, 'queries': 3.0},
+    'profile': {'p95_ms': 20.0, 'queries': 5.0},
+}
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_percentile(self):
+        """Перцентили считаются методом ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 51)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([5], 95), 5)
+
+    def test_regressions_against_baseline(self):
+        """Регрессия — рост p95 сверх допуска или лишние запросы к БД."""
+        results = {
+            'index': {'p95_ms': 11.0, 'queries': 3.0},
+            'profile': {'p95_ms': 30.0, 'queries': 6.0},
+            'post_create': {'p95_ms': 50.0, 'queries': 9.0},
+        }
+        regressions = find_regressions(results, BASELINE, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(r.startswith('profile') for r in regressions))
+
+
+class BenchmarkCommandTests(TransactionTestCase):
+    def test_command_runs_on_tiny_scale(self):
+        """Команда проходит сценарии на маленькой базе и пишет отчёт."""
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            call_command(
+                'benchmark', scale='tiny', iterations=2,
+                allocation_iterations=1, scenario=['index', 'post_detail'],
+                baseline=baseline, save_baseline=True, current_db=True,
+                stdout=out,
+            )
+            self.assertTrue(os.path.exists(baseline))
+        report = out.getvalue()
+        self.assertIn('index', report)
+        self.assertIn('post_detail', report)
@@ -0,0 +1,87 @@
+from array import array
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.follow_graph import (feed_authors, follow_key, followed_authors,
+                                following_map, is_following)
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        User.objects.bulk_create(
+            User(username=f'author{i}') for i in range(4)
+        )
+        cls.authors = list(
+            User.objects.filter(username__startswith='author').order_by('pk')
+        )
+        Follow.objects.create(user=cls.reader, author=cls.authors[2])
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_membership_without_queries(self):
+        """После первого чтения подписки проверяются без SQL."""
+        first, second, third, _ = (author.pk for author in self.authors)
+        self.assertEqual(list(followed_authors(self.reader)), [first, third])
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(self.reader, third))
+            self.assertFalse(is_following(self.reader, second))
+            self.assertEqual(
+                following_map(self.reader, [first, second]),
+                {first: True, second: False},
+            )
+        self.assertFalse(is_following(AnonymousUser(), first))
+
+    def test_follow_and_unfollow_reset_cache(self):
+        """Подписка и отписка сбрасывают массив, он собирается заново."""
+        author = self.authors[3]
+        followed_authors(self.reader)
+        Follow.objects.create(user=self.reader, author=author)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_following(self.reader, author.pk))
+        Follow.objects.filter(user=self.reader, author=author).delete()
+        with self.assertNumQueries(1):
+            self.assertFalse(is_following(self.reader, author.pk))
+
+    def test_follow_ignores_stale_cache(self):
+        """Подписка пишется в базу, даже если кэш считает её сделанной."""
+        author = self.authors[3]
+        stale = array('q', sorted([self.authors[0].pk, author.pk]))
+        cache.set(follow_key(self.reader.pk), stale)
+        self.client.force_login(self.reader)
+        self.client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=author).exists()
+        )
+
+    def test_feed_filters_by_subquery(self):
+        """Без шардов лента подписок фильтруется подзапросом, а не списком."""
+        authors = feed_authors(self.reader)
+        self.assertIsInstance(authors, QuerySet)
+        posts = Post.objects.filter(author__in=authors)
+        self.assertIn('SELECT', str(posts.query).split('IN', 1)[1])
+
+    def test_feed_count_follows_subscriptions(self):
+        """Число записей ленты меняется сразу после подписки."""
+        for author in self.authors:
+            Post.objects.create(author=author, text='Пост')
+        self.client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        Follow.objects.create(user=self.reader, author=self.authors[3])
+        response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
@@ -0,0 +1,117 @@
+import random
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorSimilarity, Follow
+from posts.recommendations import (follower_digests, numpy,
+                                   refresh_recommendations, similar_authors,
+                                   sparse, top_similar_python,
+                                   top_similar_scipy, who_to_follow)
+
+User = get_user_model()
+
+
+class RecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anna, cls.boris, cls.vera, cls.reader = (
+            User.objects.create_user(username=name)
+            for name in ('anna', 'boris', 'vera', 'reader')
+        )
+        readers = [
+            User.objects.create_user(username=f'fan{i}') for i in range(4)
+        ]
+        # Все читают Анну, трое из них и Бориса, один — Веру
+        for fan in readers:
+            Follow.objects.create(user=fan, author=cls.anna)
+        for fan in readers[:3]:
+            Follow.objects.create(user=fan, author=cls.boris)
+        Follow.objects.create(user=readers[3], author=cls.vera)
+        Follow.objects.create(user=cls.reader, author=cls.anna)
+
+    def setUp(self):
+        cache.clear()
+        call_command(
+            'build_recommendations', stdout=StringIO(), stderr=StringIO()
+        )
+
+    def test_similar_by_common_followers(self):
+        """Похожие авторы упорядочены по доле общих подписчиков."""
+        self.assertEqual(
+            similar_authors(self.anna, 5), [self.boris, self.vera]
+        )
+        score = AuthorSimilarity.objects.get(
+            author=self.anna, similar=self.boris
+        ).score
+        self.assertAlmostEqual(score, 3 / (5 * 3) ** 0.5)
+
+    def test_refresh_changed_authors_and_neighbours(self):
+        """
+        Повторный расчёт трогает авторов с новыми подписчиками и тех,
+        у кого с ними есть общий подписчик.
+        """
+        self.assertEqual(refresh_recommendations(5), 0)
+        Follow.objects.create(user=self.reader, author=self.vera)
+        self.assertEqual(refresh_recommendations(5), 2)
+        score = AuthorSimilarity.objects.get(
+            author=self.anna, similar=self.vera
+        ).score
+        self.assertAlmostEqual(score, 2 / 10 ** 0.5)
+        self.assertEqual(refresh_recommendations(5, full=True), 3)
+
+    def test_refresh_after_unfollow(self):
+        """Отписка убирает автора из списков, где он был."""
+        Follow.objects.filter(author=self.vera).delete()
+        self.assertEqual(refresh_recommendations(5), 1)
+        self.assertEqual(similar_authors(self.anna, 5), [self.boris])
+
+    def test_who_to_follow_skips_followed(self):
+        """В подсказках нет уже отслеживаемых авторов."""
+        self.assertEqual(
+            who_to_follow(self.reader, 5), [self.boris, self.vera]
+        )
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Кого почитать')
+        self.assertContains(
+            response, reverse('posts:profile', args=[self.boris.username])
+        )
+
+
+class SimilarityMathTests(SimpleTestCase):
+    def random_graph(self):
+        rng = random.Random(49)
+        pairs = sorted({
+            (rng.randrange(60), rng.randrange(25)) for _ in range(400)
+        })
+        users, authors = (list(column) for column in zip(*pairs))
+        return users, authors
+
+    def test_digest_is_not_plain_sum(self):
+        """Наборы подписчиков с равной суммой id различаются."""
+        digests = follower_digests([1, 4, 2, 3], [10, 10, 20, 20])
+        self.assertEqual(digests[10][0], digests[20][0])
+        self.assertNotEqual(digests[10][1], digests[20][1])
+
+    @skipUnless(numpy, 'NumPy не установлен')
+    def test_digest_same_with_numpy(self):
+        users, authors = self.random_graph()
+        with mock.patch('posts.recommendations.numpy', None):
+            expected = follower_digests(users, authors)
+        self.assertEqual(follower_digests(users, authors), expected)
+
+    @skipUnless(sparse, 'SciPy не установлен')
+    def test_scipy_matches_python(self):
+        """Матричный расчёт совпадает с чистым Python вместе с ничьими."""
+        users, authors = self.random_graph()
+        targets = sorted(set(authors))
+        self.assertEqual(
+            top_similar_scipy(users, authors, targets, 5),
+            top_similar_python(users, authors, targets, 5),
+        )
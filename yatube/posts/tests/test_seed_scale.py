@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SCALE = {
+    'users': 30,
+    'groups': 3,
+    'posts': 120,
+    'comments': 200,
+    'follows_mean': 4,
+    'image_ratio': 0.5,
+    'chunk_size': 25,
+}
+
+
+def seed(**options):
+    call_command('seed_scale', stdout=StringIO(), **{**SCALE, **options})
+
+
+def snapshot():
+    return (
+        list(User.objects.order_by('pk').values_list(
+            'username', 'first_name', 'is_superuser')),
+        list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username', 'group__slug', 'image', 'pub_date')),
+        list(Comment.objects.order_by('pk').values_list(
+            'post__text', 'author__username', 'text')),
+        list(Follow.objects.order_by('pk').values_list(
+            'user__username', 'author__username')),
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedScaleCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seeds_requested_scale(self):
+        """Команда создаёт заданное число записей без самоподписок."""
+        seed()
+        self.assertEqual(User.objects.count(), SCALE['users'])
+        self.assertEqual(Group.objects.count(), SCALE['groups'])
+        self.assertEqual(Post.objects.count(), SCALE['posts'])
+        self.assertEqual(Comment.objects.count(), SCALE['comments'])
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(User.objects.filter(is_superuser=True).exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+        self.assertFalse(
+            Comment.objects.filter(pub_date__lt=F('post__pub_date')).exists()
+        )
+        self.assertFalse(User.objects.first().has_usable_password())
+
+    def test_password_set_only_on_request(self):
+        """Пароль задаётся только явным --password."""
+        seed(password='секрет')
+        self.assertTrue(User.objects.first().check_password('секрет'))
+
+    def test_resume_gives_same_data(self):
+        """Прерванное заполнение дописывает только недостающие пачки."""
+        seed()
+        expected = snapshot()
+        Follow.objects.all().delete()
+        # Пачки пишутся атомарно, поэтому обрыв приходится на их границу
+        last_kept = Comment.objects.order_by('pk')[2 * SCALE['chunk_size']]
+        Comment.objects.filter(pk__gte=last_kept.pk).delete()
+        seed()
+        self.assertEqual(snapshot(), expected)
+        seed()
+        self.assertEqual(Post.objects.count(), SCALE['posts'])
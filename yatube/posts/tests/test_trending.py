@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Post, TrendingPost
+from posts.trending import decay_scores, rebuild_scores, trending_posts
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.quiet = Post.objects.create(author=cls.user, text='Тихий пост')
+        cls.hot = Post.objects.create(author=cls.user, text='Горячий пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user, text='Да')
+
+    def score(self, post):
+        return TrendingPost.objects.get(post=post).score
+
+    def test_comment_bumps_score(self):
+        """Каждый новый комментарий прибавляет посту единицу."""
+        self.comment(self.hot, 3)
+        self.comment(self.quiet)
+        self.assertEqual(self.score(self.hot), 3)
+        self.assertEqual(self.score(self.quiet), 1)
+
+    def test_decay_halves_and_prunes(self):
+        """За период полураспада оценки падают вдвое, малые удаляются."""
+        self.comment(self.hot, 4)
+        self.comment(self.quiet)
+        now = timezone.now()
+        decay_scores(now)
+        later = now + timedelta(seconds=settings.TRENDING_HALF_LIFE)
+        self.assertAlmostEqual(decay_scores(later), 0.5)
+        self.assertAlmostEqual(self.score(self.hot), 2)
+        decay_scores(later + timedelta(
+            seconds=settings.TRENDING_HALF_LIFE * 5
+        ))
+        self.assertFalse(TrendingPost.objects.filter(post=self.quiet).exists())
+        self.assertAlmostEqual(self.score(self.hot), 2 / 32)
+
+    def test_decay_remembers_time_after_pruning_all(self):
+        """Затухание после удаления всех строк считается от прошлого."""
+        self.comment(self.quiet)
+        now = timezone.now()
+        decay_scores(now)
+        half_life = timedelta(seconds=settings.TRENDING_HALF_LIFE)
+        decay_scores(now + half_life * 10)
+        self.assertFalse(TrendingPost.objects.exists())
+        self.comment(self.hot)
+        self.assertAlmostEqual(decay_scores(now + half_life * 11), 0.5)
+
+    def test_rebuild_weights_by_age(self):
+        """Пересчёт взвешивает комментарии по возрасту."""
+        self.comment(self.hot, 2)
+        self.comment(self.quiet)
+        half_life = timedelta(seconds=settings.TRENDING_HALF_LIFE)
+        Comment.objects.filter(post=self.hot).update(
+            pub_date=timezone.now() - half_life
+        )
+        faded = Post.objects.create(author=self.user, text='Забытый пост')
+        self.comment(faded)
+        Comment.objects.filter(post=faded).update(
+            pub_date=timezone.now() - half_life * 6
+        )
+        self.assertEqual(rebuild_scores(), 2)
+        self.assertFalse(TrendingPost.objects.filter(post=faded).exists())
+        self.assertAlmostEqual(self.score(self.hot), 1, places=3)
+        self.assertAlmostEqual(self.score(self.quiet), 1, places=3)
+
+    def test_view_orders_by_score_and_caches(self):
+        """Лента идёт по убыванию оценки и берётся из кэша."""
+        self.comment(self.quiet)
+        self.comment(self.hot, 2)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(response.context['posts'], [self.hot, self.quiet])
+        # Из кэша берётся порядок, посты читаются одним запросом
+        with self.assertNumQueries(1):
+            self.assertEqual(trending_posts(), [self.hot, self.quiet])
+
+    def test_cached_ids_see_edits_and_deletes(self):
+        """Правка и удаление поста видны в ленте до сброса кэша."""
+        self.comment(self.quiet)
+        self.comment(self.hot, 2)
+        trending_posts()
+        Post.objects.filter(pk=self.quiet.pk).update(text='Правка')
+        Post.objects.filter(pk=self.hot.pk).delete()
+        posts = trending_posts()
+        self.assertEqual(posts, [self.quiet])
+        self.assertEqual(posts[0].text, 'Правка')
@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from posts.utils import FeedPaginator
+
+ELLIPSIS = FeedPaginator.ELLIPSIS
+
+
+class FeedPaginatorTests(SimpleTestCase):
+    def test_few_pages_listed_in_full(self):
+        """Пока страниц немного, перечисляются все."""
+        paginator = FeedPaginator(range(50), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(3)), [1, 2, 3, 4, 5]
+        )
+
+    def test_window_around_current_page(self):
+        """Первые, последние и соседние с текущей страницы, между ними «…»."""
+        paginator = FeedPaginator(range(100_000), 10)
+        cases = (
+            (1, [1, 2, 3, 4, ELLIPSIS, 9999, 10000]),
+            (500, [1, 2, ELLIPSIS, 497, 498, 499, 500, 501, 502, 503,
+                   ELLIPSIS, 9999, 10000]),
+            (10000, [1, 2, ELLIPSIS, 9997, 9998, 9999, 10000]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected
+                )
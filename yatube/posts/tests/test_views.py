@@ -1,15 +1,25 @@
 import shutil
 import tempfile
+import time
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 
-from posts.models import Follow, Group, Post
+from core.page_cache import get_content_version
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                          Group, Post)
+from posts.profiles import get_profile_author
 
 User = get_user_model()
 
@@ -57,6 +67,7 @@ class PostPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.autoriset_client = Client()
         self.autoriset_client.force_login(PostPagesTests.user)
 
@@ -258,6 +269,7 @@ class PaginatorViewsTest(TestCase):
         Post.objects.bulk_create(obj_post_pagin)
 
     def setUp(self):
+        cache.clear()
         self.autoriset_user = Client()
         self.autoriset_user.force_login(PaginatorViewsTest.user)
 
@@ -313,6 +325,7 @@ class FollowViewsTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.follower = Client()
         self.follower.force_login(FollowViewsTest.follower)
         self.author = Client()
@@ -373,3 +386,358 @@ class FollowViewsTest(TestCase):
         self.assertNotIn(
             new_post.text, response.context['page_obj'].object_list
         )
+
+
+class ConditionalGetViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Текст тестового поста',
+            author=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetViewsTest.user)
+
+    def test_not_modified_with_actual_etag(self):
+        """Страницы отвечают 304, пока контент не изменился."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_etag_changes_with_content(self):
+        """После изменения контента страница отдаётся целиком."""
+        url = reverse('posts:index')
+        etag = self.authorized_client.get(url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        """ETag анонимной страницы не подходит авторизованному."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_only_etag_validates(self):
+        """Last-Modified не отдаётся, If-Modified-Since не даёт 304."""
+        url = reverse('posts:index')
+        response = self.authorized_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        response = self.authorized_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class ArchiveViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='archive',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user, group=cls.group)
+            for i in range(TEST_TOTAL_POSTS)
+        )
+        cls.old_post, cls.hot_post = Post.objects.order_by('pk')[:2]
+        Comment.objects.create(
+            post=cls.old_post, author=cls.user, text='Старый комментарий'
+        )
+        Comment.objects.create(
+            post=cls.hot_post, author=cls.user, text='Горячий комментарий'
+        )
+        # Первые посты и все комментарии старше года
+        year_ago = timezone.now() - timedelta(days=400)
+        Post.objects.filter(pk__lte=cls.old_post.pk + SECOND_PAGE).update(
+            pub_date=year_ago
+        )
+        Comment.objects.update(pub_date=year_ago)
+
+    def setUp(self):
+        cache.clear()
+        call_command(
+            'archive_posts', days=365, batch_size=2, stdout=StringIO()
+        )
+
+    def test_command_moves_old_rows(self):
+        """Старые посты и комментарии переносятся в архив."""
+        self.assertEqual(ArchivedPost.objects.count(), SECOND_PAGE + 1)
+        self.assertEqual(ArchivedComment.objects.count(), 2)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Post.objects.filter(pk=self.old_post.pk).exists())
+
+    def test_feeds_continue_into_archive(self):
+        """Профиль и группа после горячих постов показывают архивные."""
+        urls = (
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url + '?page=2')
+                page_obj = response.context['page_obj']
+                self.assertEqual(
+                    page_obj.paginator.count, TEST_TOTAL_POSTS
+                )
+                self.assertEqual(len(page_obj), SECOND_PAGE)
+                self.assertTrue(
+                    all(post.is_archived for post in page_obj)
+                )
+
+    def test_fragment_continues_into_archive(self):
+        """Фрагмент после горячих постов профиля отдаёт архивные."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        cursor = self.client.get(url).context['next_cursor']
+        response = self.client.get(url, {'fragment': 1, 'cursor': cursor})
+        posts = response.context['posts']
+        self.assertEqual(len(posts), SECOND_PAGE)
+        self.assertTrue(all(post.is_archived for post in posts))
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_post_detail_serves_archived(self):
+        """Архивный пост открывается со своими комментариями."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.old_post.pk})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['post'].text, self.old_post.text)
+        self.assertContains(response, 'Старый комментарий')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.hot_post.pk})
+        )
+        self.assertContains(response, 'Горячий комментарий')
+
+
+class StaleCountViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='counted')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(30)
+        )
+        cls.pks = list(
+            Post.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_empty_page_renders(self):
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_stale_count_gives_empty_page(self):
+        """Устаревший счётчик оставляет пустые страницы без ошибки."""
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk__in=self.pks[5:]).delete()
+        self.assert_empty_page_renders()
+
+    @override_settings(COUNT_EXACT_LIMIT=3)
+    def test_overestimated_count_gives_empty_page(self):
+        """Завышенная оценка оставляет пустые страницы без ошибки."""
+        # Старые ключи почти пусты, новые плотные: оценка — 30 постов
+        Post.objects.filter(pk__in=self.pks[1:25]).delete()
+        self.assert_empty_page_renders()
+
+
+@override_settings(LIMIT_COMMENTS=4)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='Вирусный пост', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Горячий {i}')
+            for i in range(6)
+        )
+        # Одинаковое время: порядок внутри пачки задаёт id
+        Comment.objects.update(pub_date=timezone.now())
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(
+                post_id=cls.post.pk,
+                author=cls.user,
+                text=f'Архивный {i}',
+                pub_date=timezone.now() - timedelta(days=400 + i),
+            )
+            for i in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_walks_hot_then_archived(self):
+        """Курсор проходит все комментарии по одному разу по порядку."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        texts = [comment.text for comment in response.context['comments']]
+        cursor = response.context['next_cursor']
+        url = reverse('posts:comment_list', kwargs={'post_id': self.post.pk})
+        while cursor:
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertNotContains(response, '<html')
+            texts += [comment.text for comment in response.context['comments']]
+            cursor = response.context['next_cursor']
+        self.assertEqual(
+            texts,
+            [f'Горячий {i}' for i in reversed(range(6))]
+            + [f'Архивный {i}' for i in range(5)],
+        )
+
+    def test_invalid_cursor_starts_over(self):
+        """Испорченный курсор отдаёт первую пачку."""
+        url = reverse('posts:comment_list', kwargs={'post_id': self.post.pk})
+        cursors = (
+            'h.oops',
+            # Время вне диапазона дат и id шире 64 бит
+            'h.99999999999999999999.1',
+            'h.1.99999999999999999999999',
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(len(response.context['comments']), 4)
+                self.assertContains(response, 'Показать ещё')
+
+
+class FeedFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='scroller')
+        cls.group = Group.objects.create(
+            title='Лента', slug='feed', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user, group=cls.group)
+            for i in range(TEST_TOTAL_POSTS)
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_fragments_continue_feeds(self):
+        """Фрагменты дописывают ленту после первой страницы без макета."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+        )
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('text', flat=True)
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                texts = [post.text for post in response.context['page_obj']]
+                cursor = response.context['next_cursor']
+                while cursor:
+                    response = self.client.get(
+                        url, {'fragment': 1, 'cursor': cursor}
+                    )
+                    self.assertNotContains(response, '<html')
+                    texts += [post.text for post in response.context['posts']]
+                    cursor = response.context['next_cursor']
+                self.assertEqual(texts, expected)
+
+    def test_malformed_fragment_cursor_starts_over(self):
+        """Испорченный курсор фрагмента отдаёт первую пачку, а не 500."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+        )
+        cursors = ('h.99999999999999999999.1', 'h.1.99999999999999999999999')
+        for url in urls:
+            for cursor in cursors:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(
+                        url, {'fragment': 1, 'cursor': cursor}
+                    )
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertEqual(
+                        len(response.context['posts']), settings.LIMIT_POST
+                    )
+
+
+class ProfileHeaderTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='header')
+        cls.fan = User.objects.create_user(username='fan')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author) for i in range(3)
+        )
+        ArchivedPost.objects.create(
+            id=10_000, text='Старый пост', author=cls.author,
+            pub_date=timezone.now() - timedelta(days=400),
+        )
+        Follow.objects.create(user=cls.fan, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.fan)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_header_in_one_cached_query(self):
+        """Шапка профиля собирается одним запросом и берётся из кэша."""
+        with self.assertNumQueries(1):
+            author = get_profile_author(self.author.username)
+        self.assertEqual(author.posts_count, 4)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(author.following_count, 1)
+        with self.assertNumQueries(0):
+            get_profile_author(self.author.username)
+
+    def test_cached_header_has_no_private_fields(self):
+        """В кэш попадают только поля шапки, без пароля и почты."""
+        get_profile_author(self.author.username)
+        key = f'profile:{get_content_version()}:{self.author.username}'
+        header = cache.get(key)
+        self.assertEqual(header['username'], self.author.username)
+        self.assertNotIn('password', header)
+        self.assertNotIn('email', header)
+
+    def test_profile_uses_header_counts(self):
+        """Профиль показывает числа из шапки и не считает посты заново."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.author})
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 4)
+        self.assertContains(response, 'Подписчиков: 1, подписок: 1')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'nobody'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
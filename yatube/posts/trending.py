@@ -0,0 +1,124 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.db import batches
+from core.page_cache import bump_content_version
+
+from .models import Comment, Post, TrendingClock, TrendingPost
+
+TRENDING_CACHE_KEY = 'trending:post_ids'
+CLOCK_ID = 1
+
+
+def bump_post(post_id):
+    """Прибавляет посту единицу за новый комментарий одним UPDATE."""
+    bumped = TrendingPost.objects.filter(post_id=post_id).update(
+        score=F('score') + 1
+    )
+    if bumped:
+        return
+    try:
+        with transaction.atomic():
+            TrendingPost.objects.create(post_id=post_id, score=1)
+    except IntegrityError:
+        # Строку успел создать параллельный комментарий
+        TrendingPost.objects.filter(post_id=post_id).update(
+            score=F('score') + 1
+        )
+
+
+def decay_scores(now=None):
+    """
+    Уменьшает все оценки пропорционально времени с прошлого затухания:
+    вдвое за каждые TRENDING_HALF_LIFE секунд. Строки с оценкой ниже
+    TRENDING_MIN_SCORE удаляются. Порядок ленты меняется без новых
+    комментариев, поэтому страницы инвалидируются. Возвращает
+    множитель затухания.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        clock, created = (
+            TrendingClock.objects.select_for_update()
+            .get_or_create(pk=CLOCK_ID, defaults={'decayed_at': now})
+        )
+        factor = 1.0
+        if not created:
+            elapsed = (now - clock.decayed_at).total_seconds()
+            factor = 0.5 ** (max(elapsed, 0) / settings.TRENDING_HALF_LIFE)
+        TrendingPost.objects.update(score=F('score') * factor)
+        TrendingPost.objects.filter(
+            score__lt=settings.TRENDING_MIN_SCORE
+        ).delete()
+        clock.decayed_at = now
+        clock.save(update_fields=['decayed_at'])
+    cache.delete(TRENDING_CACHE_KEY)
+    bump_content_version()
+    return factor
+
+
+def rebuild_scores(now=None, half_lives=8):
+    """
+    Пересчитывает оценки заново по комментариям за последние
+    half_lives периодов полураспада, более старые почти ничего не
+    весят. Нужен после массовой загрузки, которая не шлёт сигналов.
+    Возвращает число постов с оценкой.
+    """
+    now = now or timezone.now()
+    half_life = settings.TRENDING_HALF_LIFE
+    since = now - timedelta(seconds=half_life * half_lives)
+    scores = defaultdict(float)
+    for db in settings.DATABASE_SHARDS or [DEFAULT_DB_ALIAS]:
+        comments = Comment.objects.using(db).filter(pub_date__gte=since)
+        for post_id, pub_date in comments.values_list(
+            'post_id', 'pub_date'
+        ).iterator():
+            age = (now - pub_date).total_seconds()
+            scores[post_id] += 0.5 ** (max(age, 0) / half_life)
+    scored = [
+        post_id for post_id, score in scores.items()
+        if score >= settings.TRENDING_MIN_SCORE
+    ]
+    # Комментарии в шарде могут пережить удалённый пост
+    existing = []
+    for batch in batches(scored):
+        existing += Post.objects.filter(pk__in=batch).values_list(
+            'pk', flat=True
+        )
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(post_id=post_id, score=scores[post_id])
+            for post_id in existing
+        )
+        TrendingClock.objects.update_or_create(
+            pk=CLOCK_ID, defaults={'decayed_at': now}
+        )
+    cache.delete(TRENDING_CACHE_KEY)
+    bump_content_version()
+    return len(existing)
+
+
+def trending_posts():
+    """
+    TRENDING_SIZE самых обсуждаемых постов. Порядок читается по индексу
+    score и хранится в кэше TRENDING_CACHE_TIMEOUT секунд: комментарии
+    идут постоянно, сбрасывать ленту на каждый невыгодно. В кэше только
+    id, сами посты читаются заново: правки и удаления видны сразу.
+    """
+    post_ids = cache.get(TRENDING_CACHE_KEY)
+    if post_ids is None:
+        post_ids = list(
+            TrendingPost.objects.values_list('post_id', flat=True)
+            [:settings.TRENDING_SIZE]
+        )
+        cache.set(
+            TRENDING_CACHE_KEY, post_ids, settings.TRENDING_CACHE_TIMEOUT
+        )
+    posts = Post.objects.select_related('author', 'group').in_bulk(post_ids)
+    return [posts[pk] for pk in post_ids if pk in posts]
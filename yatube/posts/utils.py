@@ -1,9 +1,85 @@
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.shortcuts import render
+from django.utils.functional import cached_property
 
+from core.db import cached_count
 
-def pagination(request, queryset):
-    paginator = Paginator(queryset, settings.LIMIT_POST)
+from .archive import cursor_batch, cursor_sources, make_cursor
+
+
+class FeedPaginator(Paginator):
+    """
+    Paginator с окном номеров страниц вокруг текущей, как
+    get_elided_page_range из Django 3.2: ссылок на странице
+    одинаково мало при любом числе страниц. Число записей берётся
+    из кэша или оценивается, см. cached_count.
+    """
+    ELLIPSIS = '…'
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            return cached_count(self.object_list)
+        return super().count
+
+    def get_elided_page_range(self, number=1, *, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+def pagination(request, queryset, count=None):
+    paginator = FeedPaginator(queryset, settings.LIMIT_POST)
+    if count is not None:
+        # Число уже известно вызывающему, COUNT не нужен
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.elided_page_range = list(
+        paginator.get_elided_page_range(page_obj.number)
+    )
     return page_obj
+
+
+def render_feed(request, template_name, posts, context=None, count=None):
+    """
+    Страница ленты или, с ?fragment=1, только карточки следующей
+    пачки после ?cursor= без макета сайта для бесконечной прокрутки.
+    Фрагмент выбирается параметром, а не заголовком: кэш страниц
+    различает ответы только по адресу.
+    """
+    context = dict(context or {})
+    if request.GET.get('fragment'):
+        context['posts'], context['next_cursor'] = cursor_batch(
+            cursor_sources(posts), request.GET.get('cursor'),
+            settings.LIMIT_POST,
+        )
+        return render(request, 'posts/includes/feed_fragment.html', context)
+    if callable(count):
+        # Фрагменту число записей не нужно, считаем только для страницы
+        count = count()
+    page_obj = pagination(request, posts, count)
+    context['page_obj'] = page_obj
+    # Число записей может быть устаревшим или оценкой: страница из
+    # paginator.page_range бывает пустой
+    size = len(page_obj)
+    context['next_cursor'] = (
+        make_cursor(page_obj[size - 1])
+        if size and page_obj.has_next() else None
+    )
+    return render(request, template_name, context)
@@ -1,62 +1,98 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.db import cached_count
+from core.page_cache import content_condition
+from core.writer import run_write
+
+from .archive import get_post_or_archived, post_comments, with_archived_posts
+from .follow_graph import feed_authors, follows_digest
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import pagination
+from .models import Group, Post
+from .profiles import get_profile_author
+from .recommendations import similar_authors, who_to_follow
+from .trending import trending_posts
+from .utils import render_feed
 
 User = get_user_model()
 
 
+@content_condition
 def index(request):
-    page_obj = pagination(
-        request,
-        Post.objects.select_related('group').all()
+    return render_feed(
+        request, 'posts/index.html',
+        Post.objects.select_related('author', 'group'),
     )
-    context = {
-        'page_obj': page_obj,
-    }
-    return render(request, 'posts/index.html', context)
 
 
+@content_condition
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    page_obj = pagination(request, group.posts.all())
-    context = {
-        'group': group,
-        'page_obj': page_obj,
-    }
-    return render(request, 'posts/group_list.html', context)
+    posts = with_archived_posts(
+        group.posts.select_related('author'), group=group
+    )
+    return render_feed(
+        request, 'posts/group_list.html', posts, {'group': group}
+    )
 
 
+@content_condition
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    page_obj = pagination(request, author.posts.all())
-    following = (request.user.is_authenticated and author != request.user
-                 and Follow.objects.filter(
-                     author=author, user=request.user).exists()
-                 )
+    author = get_profile_author(username)
+    posts = with_archived_posts(
+        author.posts.select_related('group'), author=author
+    )
     context = {
         'author': author,
-        'page_obj': page_obj,
-        'following': following
+        'recommended': partial(
+            similar_authors, author, settings.RECOMMENDATIONS_SHOWN
+        ),
     }
-    return render(request, 'posts/profile.html', context)
+    return render_feed(
+        request, 'posts/profile.html', posts, context,
+        count=author.posts_count,
+    )
 
 
+@content_condition
+def trending(request):
+    context = {
+        'posts': trending_posts(),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@content_condition
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post_or_archived(post_id)
     form = CommentForm()
-    comments = post.comments.all()
+    comments, next_cursor = post_comments(post, request.GET.get('cursor'))
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'next_cursor': next_cursor,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@content_condition
+def comment_list(request, post_id):
+    """Следующая пачка комментариев без макета страницы."""
+    post = get_post_or_archived(post_id)
+    comments, next_cursor = post_comments(post, request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'comments': comments,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -64,7 +100,7 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        run_write(post.save)
         return redirect('posts:profile', username=post.author)
     context = {
         'form': form,
@@ -97,38 +133,48 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = Post.objects.get(id=post_id)
+    post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        run_write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@content_condition
 def follow_index(request):
-    post_follow_author = Post.objects.filter(
-        author__following__user=request.user
+    post_follow_author = Post.objects.select_related(
+        'author', 'group'
+    ).filter(author__in=feed_authors(request.user))
+    # Шаблон вызовет функцию, только если покажет блок: не во фрагментах
+    recommended = partial(
+        who_to_follow, request.user, settings.RECOMMENDATIONS_SHOWN
+    )
+    # Текст запроса с подзапросом подписок у пользователя не меняется,
+    # счётчик различается по набору подписок
+    count = partial(
+        cached_count, post_follow_author,
+        scope=follows_digest(request.user),
+    )
+    return render_feed(
+        request, 'posts/follow.html', post_follow_author,
+        {'recommended': recommended}, count=count,
     )
-    page_obj = pagination(request, post_follow_author)
-    context = {
-        'page_obj': page_obj
-    }
-    return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        run_write(request.user.follower.get_or_create, author=author)
     return (redirect('posts:profile', username))
 
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(Follow, user=request.user,
-                      author__username=username).delete()
+    author = get_object_or_404(User, username=username)
+    get_object_or_404(request.user.follower, author=author).delete()
     return redirect('posts:profile', username=username)
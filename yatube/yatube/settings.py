@@ -11,8 +11,10 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 LIMIT_POST = 10
+LIMIT_COMMENTS = 20
 NUM_SYMBOL__STR__ = 15
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -68,11 +70,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SamplingProfilerMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',
+    'core.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PersonalPageCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -83,7 +91,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -111,6 +119,43 @@ DATABASES = {
     }
 }
 
+# Базы отдельных приложений (app_label -> alias) для core.routers,
+# см. профиль yatube.settings_split_db
+DATABASE_APPS_MAPPING = {}
+
+# Реплики только для чтения (core.routers.ReplicaRouter),
+# см. профиль yatube.settings_replicas
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_APPS = ['posts']
+REPLICA_STICKY_SECONDS = 5
+REPLICA_STICKY_COOKIE = 'primary_reads'
+
+# Шарды (core.routers.ShardRouter): модель -> поле-ключ шардирования,
+# см. профиль yatube.settings_shards
+DATABASE_SHARDS = []
+DATABASE_SHARDED_MODELS = {
+    'posts.comment': 'post',
+    'posts.follow': 'user',
+}
+
+# PRAGMA для каждого нового соединения с SQLite (core.db):
+# WAL не блокирует чтение записью, busy_timeout ждёт блокировку
+# вместо ошибки "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+# Очередь записи (core.writer): создание постов, комментариев и подписок
+# выполняет один поток процесса, объединяя записи в общие транзакции.
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_BATCH_SIZE = 50
+WRITE_QUEUE_TIMEOUT = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -164,6 +209,105 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.backends.InstrumentedLocMemCache',
     }
 }
+
+# Полностраничный кэш: целые страницы для анонимных пользователей,
+# страницы с персональными фрагментами для остальных (0 — выключен)
+PAGE_CACHE_TIMEOUT = 60 * 5
+PAGE_CACHE_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+)
+
+# Подписки пользователя в кэше: массив id авторов сбрасывается сигналами
+# подписки, но только в кэше процесса, который её записал: LocMemCache у
+# каждого процесса свой. В остальных процессах старый массив живёт до
+# FOLLOW_GRAPH_TIMEOUT, столько же, сколько страницы в кэше
+FOLLOW_GRAPH_TIMEOUT = PAGE_CACHE_TIMEOUT
+
+# «Кого почитать»: build_recommendations хранит RECOMMENDATIONS_TOP_K
+# похожих авторов на автора, страницы показывают RECOMMENDATIONS_SHOWN
+RECOMMENDATIONS_TOP_K = 20
+RECOMMENDATIONS_SHOWN = 5
+
+# «Обсуждаемое»: комментарий прибавляет посту единицу, decay_trending
+# уменьшает оценки вдвое за TRENDING_HALF_LIFE секунд и удаляет
+# опустившиеся ниже TRENDING_MIN_SCORE; лента кэшируется на
+# TRENDING_CACHE_TIMEOUT секунд
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_MIN_SCORE = 0.05
+TRENDING_SIZE = 20
+TRENDING_CACHE_TIMEOUT = 60
+
+# Размеры лент для пагинации: кэшируются на COUNT_CACHE_TIMEOUT секунд;
+# больше COUNT_EXACT_LIMIT строк не считаются, а оцениваются по плану
+# запроса PostgreSQL или по плотности первичных ключей
+COUNT_CACHE_TIMEOUT = 60
+COUNT_EXACT_LIMIT = 10_000
+
+# Метрики MetricsMiddleware: каждый процесс раз в METRICS_FLUSH_INTERVAL
+# секунд сохраняет сводку в METRICS_DIR, /metrics складывает сводки
+# живых процессов, сводки умерших удаляются. Каталог задаётся для
+# каждого развёртывания своим (переменная окружения METRICS_DIR): в
+# общем каталоге сложились бы процессы чужих сайтов. Без него /metrics
+# показывает только обработавший запрос процесс.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = 1
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+# Профилировщик: доля запросов включается в /admin/profiler/, хранится
+# в файле в PROFILER_DIR и перечитывается процессом раз в
+# PROFILER_SWITCH_TTL секунд. Там же отмечаются использованные токены,
+# поэтому все процессы сервера должны видеть один каталог
+PROFILER_DIR = os.path.join(tempfile.gettempdir(), 'yatube-profiles')
+PROFILER_INTERVAL = 0.005
+PROFILER_SWITCH_TTL = 5
+PROFILER_TOKEN_MAX_AGE = 60 * 5
+
+# Диагностика памяти (/admin/memory/, manage.py memory_report)
+MEMORY_TRACE_FRAMES = 1
+MEMORY_REPORT_LIMIT = 20
+
+# Базовая версия замеров manage.py benchmark
+BENCHMARK_BASELINE = os.path.join(BASE_DIR, 'benchmark_baseline.json')
+
+THUMBNAIL_BACKEND = 'core.backends.InstrumentedThumbnailBackend'
+
+# Журнал медленных запросов (None — выключен)
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_SAMPLE_INTERVAL = 60
+
+# Поиск N+1: None — выключен, 'log' — в лог, 'raise' — исключение.
+# Обёртка каждого SQL-запроса стоит времени, поэтому по умолчанию
+# выключен; на staging включается переменной окружения NPLUSONE_MODE=log.
+# Тесты запускаются с 'raise' (TEST_RUNNER, tests/conftest.py)
+NPLUSONE_MODE = os.environ.get('NPLUSONE_MODE') or None
+NPLUSONE_THRESHOLD = 5
+# sorl-thumbnail ходит в свою таблицу только при холодном кэше
+NPLUSONE_IGNORED_TABLES = ('thumbnail_kvstore',)
+
+TEST_RUNNER = 'core.test_runner.NPlusOneTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'core.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
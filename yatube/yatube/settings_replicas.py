@@ -0,0 +1,37 @@
+"""
+Профиль настроек с репликами SQLite только для чтения. Реплики —
+локальные копии основной базы, их обновляет команда sync_replicas:
+
+    DJANGO_SETTINGS_MODULE=yatube.settings_replicas
+    python manage.py migrate
+    python manage.py sync_replicas
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, MIDDLEWARE
+
+DATABASE_REPLICAS = ['replica1', 'replica2']
+
+DATABASES = {
+    **DATABASES,
+    **{
+        alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+            'TEST': {'MIRROR': 'default'},
+        }
+        for alias in DATABASE_REPLICAS
+    },
+}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сразу после SecurityMiddleware, до кэша страниц
+_security = MIDDLEWARE.index('django.middleware.security.SecurityMiddleware')
+MIDDLEWARE = [
+    *MIDDLEWARE[:_security + 1],
+    'core.middleware.ReplicaStickyMiddleware',
+    *MIDDLEWARE[_security + 1:],
+]
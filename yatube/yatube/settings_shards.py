@@ -0,0 +1,30 @@
+"""
+Профиль настроек с шардами SQLite: комментарии раскладываются по
+post_id, подписки по user_id. В шардах только эти таблицы, поэтому
+внешние ключи в них не проверяются.
+
+    DJANGO_SETTINGS_MODULE=yatube.settings_shards
+    python manage.py migrate
+    python manage.py migrate --database=shard_0  # и для каждого шарда
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+DATABASE_SHARDS = ['shard_0', 'shard_1', 'shard_2']
+
+DATABASES = {
+    **DATABASES,
+    **{
+        alias: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+            'SQLITE_PRAGMAS': {'foreign_keys': 'OFF'},
+        }
+        for alias in DATABASE_SHARDS
+    },
+}
+
+DATABASE_ROUTERS = ['core.routers.ShardRouter']
@@ -0,0 +1,42 @@
+"""
+Профиль настроек с раздельными файлами SQLite: сессии и кэш пишутся
+в свои базы и не держат блокировку записи базы с постами.
+
+    DJANGO_SETTINGS_MODULE=yatube.settings_split_db
+    python manage.py migrate
+    python manage.py migrate --database=sessions
+    python manage.py createcachetable --database=cache
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'sessions': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_sessions.sqlite3'),
+    },
+    'cache': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_cache.sqlite3'),
+    },
+}
+
+DATABASE_ROUTERS = ['core.routers.AppDatabaseRouter']
+
+# django_cache — app_label модели DatabaseCache
+DATABASE_APPS_MAPPING = {
+    'sessions': 'sessions',
+    'django_cache': 'cache',
+}
+
+# Общий для всех процессов кэш страниц в своей базе
+CACHES = {
+    'default': {
+        'BACKEND': 'core.backends.InstrumentedDatabaseCache',
+        'LOCATION': 'cache_table',
+    }
+}
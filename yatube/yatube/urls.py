@@ -3,12 +3,17 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import memory_diagnostics, metrics, profiler_switch
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path('admin/profiler/', profiler_switch, name='profiler_switch'),
+    path('admin/memory/', memory_diagnostics, name='memory_diagnostics'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics', metrics, name='metrics'),
 ]
 
 